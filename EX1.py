@@ -1,20 +1,36 @@
+import hashlib
 import networkx as nx
 import random
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from scipy.stats import binom_test
-import pickle
 import powerlaw
 import matplotlib.pyplot as plt
 from scipy.stats import probplot
+from scipy.stats import beta, binom
+from scipy.special import zeta
+import graph_store
+import path_stats
 
-with open('rand_nets.p', 'rb') as f:
-    rand_nets_networks = pickle.load(f)
+# The pickled networks are converted once into the memory-mapped graph store and
+# only opened when one of these module attributes is first accessed. The same
+# name with a '_csr' suffix (e.g. rand_nets_networks_csr) gives the store's
+# graph_store.CSRGraph objects, which networks_avg_stats, network_counts and
+# classify_networks take without building networkX graphs.
+NETWORK_FILES = {'rand_nets_networks': 'rand_nets.p',
+                 'scalefree_nets_networks': 'scalefree_nets.p',
+                 'mixed_nets_networks': 'mixed_nets.p'}
 
-with open('scalefree_nets.p', 'rb') as f:
-    scalefree_nets_networks = pickle.load(f)
 
-with open('mixed_nets.p', 'rb') as f:
-    mixed_nets_networks = pickle.load(f)
+def __getattr__(name):
+    csr = name.endswith('_csr')
+    path = NETWORK_FILES.get(name[:-len('_csr')] if csr else name)
+    if path is not None:
+        networks = graph_store.load_graphs(path, as_networkx=not csr)
+        globals()[name] = networks
+        return networks
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 def random_networks_generator(n, p, num_networks=1, directed=False, seed=209505593):
     """
@@ -33,20 +49,110 @@ def random_networks_generator(n, p, num_networks=1, directed=False, seed=2095055
         networks.append(G)
     return networks
 
-def network_stats(G):
+def _path_lengths(G, workers=1, approximate=False, samples=None, target_error=None):
+    if approximate:
+        return path_stats.approximate_shortest_path_stats(G, samples=samples, target_error=target_error)
+    return path_stats.shortest_path_stats(G, workers=workers)
+
+
+def gnp_edges(n, p, directed=False, rng=None):
+    """
+    Sample the edges of a G(n,p) network in O(n + m) by geometric skipping over
+    the candidate node pairs, drawing the skips in vectorized batches.
+
+    :param: n: Number of nodes.
+            p: Probability for a pair of nodes to be connected.
+            directed: Whether the network is directed or not.
+            rng: numpy Generator to draw from.
+    :return: int array of shape (m, 2), each row an edge (u, v).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    pairs = n * (n - 1) if directed else n * (n - 1) // 2
+    if p <= 0 or pairs == 0:
+        positions = np.empty(0, dtype=np.int64)
+    elif p >= 1:
+        positions = np.arange(pairs, dtype=np.int64)
+    else:
+        expected = pairs * p
+        batch = int(expected + 5 * np.sqrt(expected)) + 16
+        chunks = []
+        last = -1
+        while last < pairs:
+            chunk = last + np.cumsum(rng.geometric(p, size=batch))
+            chunks.append(chunk)
+            last = chunk[-1]
+        positions = np.concatenate(chunks)
+        positions = positions[positions < pairs]
+    if directed:
+        u = positions // (n - 1)
+        v = positions % (n - 1)
+        v += v >= u
+    else:
+        # position k stands for the pair (u, v), v < u, with k = u * (u - 1) / 2 + v
+        u = ((1 + np.sqrt(1 + 8 * positions.astype(np.float64))) // 2).astype(np.int64)
+        u -= u * (u - 1) // 2 > positions
+        u += (u + 1) * u // 2 <= positions
+        v = positions - u * (u - 1) // 2
+    return np.column_stack([u, v])
+
+
+def random_networks_stream(n, p, num_networks=1, directed=False, seed=209505593, output='networkx'):
+    """
+    Generate random G(n,p) networks one at a time.
+    Network i is drawn from a numpy Generator seeded with seed+i, so every
+    network can be reproduced on its own (the graphs differ from the ones
+    random_networks_generator draws through nx.gnp_random_graph).
+
+    :param: n: Number of nodes in each network.
+            p: Probability for a pair of nodes to be connected.
+            num_netwroks: Number of networks to generate.
+            directed: Whether the network is directed or not.
+            output: 'networkx' for NetworkX objects, 'csr' for graph_store.CSRGraph,
+                    'edges' for int arrays of shape (m, 2).
+    :return: generator over the networks.
+    """
+    if output not in ('networkx', 'csr', 'edges'):
+        raise ValueError('Unknown output format')
+    for i in range(num_networks):
+        edges = gnp_edges(n, p, directed, np.random.default_rng(seed + i))
+        if output == 'edges':
+            yield edges
+        elif output == 'csr':
+            yield graph_store.csr_from_edges(n, edges, directed)
+        else:
+            G = nx.DiGraph() if directed else nx.Graph()
+            G.add_nodes_from(range(n))
+            G.add_edges_from(edges.tolist())
+            yield G
+
+
+def _degrees(G):
+    if isinstance(G, graph_store.CSRGraph):
+        return G.degree().tolist()
+    return [d for n, d in G.degree()]
+
+
+def network_stats(G, workers=1, approximate=False, samples=None, target_error=None):
     """
     Calculates basic statistics for a given network.
 
     :param: G: networkX object, the network to analyze
-    :return: dict, a dictionary with statistics about the network
+            workers: number of processes the shortest path sources are split across
+            approximate: estimate spl from sampled sources and bound the diameter instead of exact all-pairs work
+            samples: maximal number of sampled sources in approximate mode
+            target_error: in approximate mode, sample until the spl confidence interval half-width is below it
+    :return: dict, a dictionary with statistics about the network.
+            In approximate mode it also holds 'spl_ci' and 'diameter_bounds' as (lower, upper) tuples.
     """
-    degrees = [d for n, d in G.degree()]
+    degrees = _degrees(G)
     degrees_avg = np.mean(degrees)
     degrees_std = np.std(degrees)
     degrees_min = min(degrees)
     degrees_max = max(degrees)
-    spl = nx.average_shortest_path_length(G)
-    diameter = nx.diameter(G)
+    path_lengths = _path_lengths(G, workers, approximate, samples, target_error)
+    spl = path_lengths['spl']
+    diameter = path_lengths['diameter']
 
     dict_stats = {
                 'degrees_avg': degrees_avg,
@@ -55,22 +161,35 @@ def network_stats(G):
                 'degrees_max': degrees_max,
                 'spl': spl,
                 'diameter': diameter}
+    if approximate:
+        dict_stats['spl_ci'] = path_lengths['spl_ci']
+        dict_stats['diameter_bounds'] = path_lengths['diameter_bounds']
     return dict_stats
 
-def networks_avg_stats(networks):
+def networks_avg_stats(networks, workers=1, approximate=False, samples=None, target_error=None):
     """
     Calculates basic statistics for a given list of networks.
 
-    :param: networks: a list of networkX objects
+    :param: networks: a list (or any iterable, e.g. random_networks_stream) of networkX objects or graph_store.CSRGraph
+            workers: number of processes the networks are spread across
+            approximate, samples, target_error: see network_stats
     :return: a dictionary with some statistics about the list of networks.
+            In approximate mode it also holds 'spl_avg_ci' and 'diameter_avg_bounds' as (lower, upper) tuples.
     """
     degrees = []
-    spls = []
-    diameters = []
-    for G in networks:
-        degrees += [d for n, d in G.degree()]
-        spls.append(nx.average_shortest_path_length(G))
-        diameters.append(nx.diameter(G))
+    if workers > 1 and not approximate:
+        networks = list(networks)
+        for G in networks:
+            degrees += _degrees(G)
+        path_lengths = path_stats.networks_shortest_path_stats(networks, workers=workers)
+    else:
+        # single pass, so streamed networks are never all held at once
+        path_lengths = []
+        for G in networks:
+            degrees += _degrees(G)
+            path_lengths.append(_path_lengths(G, approximate=approximate, samples=samples, target_error=target_error))
+    spls = [stats['spl'] for stats in path_lengths]
+    diameters = [stats['diameter'] for stats in path_lengths]
     degrees_avg = np.mean(degrees)
     degrees_std = np.std(degrees)
     degrees_min = np.min(degrees)
@@ -84,6 +203,13 @@ def networks_avg_stats(networks):
                     'degrees_max': degrees_max,
                     'spl_avg': spl_avg,
                     'diameter_avg': diameter_avg}
+    if approximate:
+        # the per-network estimates are independent, so their half-widths add in quadrature
+        half_widths = [(stats['spl_ci'][1] - stats['spl_ci'][0]) / 2 for stats in path_lengths]
+        spl_avg_half_width = np.sqrt(np.sum(np.square(half_widths))) / len(path_lengths)
+        dict_avg_stats['spl_avg_ci'] = (spl_avg - spl_avg_half_width, spl_avg + spl_avg_half_width)
+        dict_avg_stats['diameter_avg_bounds'] = (np.mean([stats['diameter_bounds'][0] for stats in path_lengths]),
+                                                 np.mean([stats['diameter_bounds'][1] for stats in path_lengths]))
     return dict_avg_stats
 
 def rand_net_hypothesis_testing(network, theoretical_p, alpha=0.05):
@@ -124,6 +250,86 @@ def most_probable_p(network):
     return -1
 
 
+def _first_true(predicate, lo, hi):
+    """
+    Vectorized bisection: for every element, the first integer j in [lo, hi]
+    for which predicate(j) holds (hi + 1 if none), assuming predicate is
+    monotone (False ... True) over that range.
+    """
+    hi = hi + 1
+    while np.any(lo < hi):
+        mid = (lo + hi) // 2
+        found = predicate(mid) & (lo < hi)
+        hi = np.where(found, mid, hi)
+        lo = np.where(found | (lo >= hi), lo, mid + 1)
+    return lo
+
+
+def binomial_two_sided_p_values(k, n, p):
+    """
+    Two-sided exact binomial test p-values, element-wise over broadcast arrays.
+    Same convention as scipy's binom_test: the p-value sums the probabilities of
+    every outcome at most as likely as k.
+    """
+    k, n, p = np.broadcast_arrays(np.asarray(k, dtype=np.float64), np.asarray(n, dtype=np.float64), np.asarray(p, dtype=np.float64))
+    target = binom.pmf(k, n, p) * (1 + 1e-7)
+    mean = p * n
+    # k below the mean: the other tail starts at the first outcome above the mean as unlikely as k
+    upper = _first_true(lambda j: binom.pmf(j, n, p) <= target, np.ceil(mean), n.copy())
+    below = binom.cdf(k, n, p) + binom.sf(upper - 1, n, p)
+    # k above the mean: the other tail ends at the last outcome below the mean as unlikely as k
+    lower = _first_true(lambda j: binom.pmf(j, n, p) > target, np.zeros_like(n), np.floor(mean)) - 1
+    above = binom.cdf(lower, n, p) + binom.sf(k - 1, n, p)
+    p_values = np.where(k < mean, below, above)
+    return np.minimum(1.0, np.where(k == mean, 1.0, p_values))
+
+
+def rand_nets_hypothesis_matrix(nodes, edges, p_grid, alpha=0.05, confidence=0.95):
+    """
+    Performs the hypothesis testing of rand_net_hypothesis_testing for many
+    networks against every p of a grid at once, from node and edge counts only.
+
+    :param: nodes: number of nodes of every network.
+            edges: number of edges of every network.
+            p_grid: the H0 ‘p’ values to test.
+            alpha: the significance level of the tests.
+            confidence: the confidence level of the interval around the MLE p.
+    :return: dict with
+            'p_values': array (networks × p_grid) of the tests' p-values,
+            'accept': boolean array of the same shape, True where H0 was accepted,
+            'most_probable_p': first accepted p of the grid per network, as in most_probable_p (-1 if none),
+            'p_mle': the MLE p (edges / node pairs) per network,
+            'p_ci': tuple of arrays (lower, upper), the Clopper-Pearson interval around p_mle.
+    """
+    nodes = np.asarray(nodes, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    p_grid = np.asarray(p_grid, dtype=np.float64)
+    pairs = nodes * (nodes - 1) / 2
+    p_values = binomial_two_sided_p_values(edges[:, None], pairs[:, None], p_grid[None, :])
+    accept = p_values >= alpha
+    first = np.argmax(accept, axis=1)
+    most_probable = np.where(accept.any(axis=1), p_grid[first], -1)
+    tail = (1 - confidence) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_mle = edges / pairs
+        lower = np.where(edges > 0, beta.ppf(tail, edges, pairs - edges + 1), 0.0)
+        upper = np.where(edges < pairs, beta.ppf(1 - tail, edges + 1, pairs - edges), 1.0)
+    return {'p_values': p_values,
+            'accept': accept,
+            'most_probable_p': most_probable,
+            'p_mle': p_mle,
+            'p_ci': (lower, upper)}
+
+
+def network_counts(networks):
+    """
+    :param: networks: iterable of networkX objects or graph_store.CSRGraph.
+    :return: tuple of arrays (nodes, edges), the inputs of rand_nets_hypothesis_matrix.
+    """
+    counts = np.array([(G.number_of_nodes(), G.number_of_edges()) for G in networks], dtype=np.int64).reshape(-1, 2)
+    return counts[:, 0], counts[:, 1]
+
+
 def find_opt_gamma(network, treat_as_social_network=True):
     """
     Finds the optimal gamma parameter for a given network using the powerlaw package.
@@ -140,6 +346,14 @@ def find_opt_gamma(network, treat_as_social_network=True):
     gamma = fit.power_law.alpha
     return gamma
 
+def _gamma_class(gamma):
+    if gamma > 3:
+        return 1
+    elif gamma > 2 and gamma < 3:
+        return 2
+    return -1 #not scale free and not random
+
+
 def netwrok_classifier(network):
     """
     Classify a network as random or scale-free.
@@ -148,25 +362,133 @@ def netwrok_classifier(network):
     :return: 1 if the network is classified as random, 2 if it is classified as scale-free.
     """
     gamma = find_opt_gamma(network)
-    if gamma > 3:
-        return 1
-    elif gamma > 2 and gamma < 3:
-        return 2
-    return -1 #not scale free and not random
+    return _gamma_class(gamma)
+
+
+_power_law_fits = {}
+# powerlaw's default alpha range: xmins whose fit lands on its ends are rejected as in powerlaw.Fit
+GAMMA_RANGE = (0, 3)
+
+
+def _discrete_mle(xmins, tail_n, tail_log, estimates, iterations=60):
+    """
+    Exact discrete power law MLE for every xmin at once, by golden-section search
+    of the (concave) log-likelihood -gamma * sum(log x) - n * log(zeta(gamma, xmin))
+    in a bracket around the continuous approximation.
+    """
+    def log_likelihood(gamma):
+        return -gamma * tail_log - tail_n * np.log(zeta(gamma, xmins))
+
+    ratio = (np.sqrt(5) - 1) / 2
+    low = np.full_like(estimates, 1.0001)
+    high = np.where(np.isfinite(estimates), np.maximum(2 * estimates, 4.0), 4.0)
+    left = high - ratio * (high - low)
+    right = low + ratio * (high - low)
+    f_left = log_likelihood(left)
+    f_right = log_likelihood(right)
+    for _ in range(iterations):
+        move_right = f_left < f_right
+        low = np.where(move_right, left, low)
+        high = np.where(move_right, high, right)
+        left, right = np.where(move_right, right, high - ratio * (high - low)), np.where(move_right, low + ratio * (high - low), left)
+        f_left, f_right = np.where(move_right, f_right, log_likelihood(left)), np.where(move_right, log_likelihood(right), f_left)
+    return (low + high) / 2
+
+
+def fit_power_law(histogram, discrete=True):
+    """
+    Fits a power law to a degree histogram, scanning every candidate xmin at once:
+    the MLE of gamma for each xmin comes from suffix sums over the histogram, and
+    the chosen xmin minimizes the Kolmogorov-Smirnov distance (Clauset et al.).
+    As in powerlaw.Fit (used by find_opt_gamma), gamma is bounded to GAMMA_RANGE
+    and only xmins whose fit is strictly inside it compete, unless none is; the
+    continuous fit measures the KS distance against the empirical CDF just below
+    each degree, as powerlaw does.
+
+    :param: histogram: histogram[d] is the number of nodes with degree d.
+            discrete: Whether to fit the discrete (social network) or the continuous power law.
+    :return: tuple (gamma, xmin). Both are nan when fewer than three distinct positive degrees exist.
+    """
+    histogram = np.asarray(histogram)
+    values = np.flatnonzero(histogram)
+    values = values[values > 0]
+    if len(values) < 3:
+        return np.nan, np.nan
+    counts = histogram[values].astype(np.float64)
+    # the largest value is not a candidate, as it is also the xmax
+    candidates = values[:-1].astype(np.float64)
+    tail_n = np.cumsum(counts[::-1])[::-1][:-1]
+    tail_log = np.cumsum((counts * np.log(values))[::-1])[::-1][:-1]
+    shift = 0.5 if discrete else 0
+    gammas = 1 + tail_n / (tail_log - tail_n * np.log(candidates - shift))
+    if discrete:
+        gammas = _discrete_mle(candidates, tail_n, tail_log, gammas)
+    # the likelihood is concave in gamma, so the bounded MLE is the clipped one
+    gammas = np.clip(gammas, *GAMMA_RANGE)
+    valid = (gammas > GAMMA_RANGE[0]) & (gammas < GAMMA_RANGE[1])
+
+    # KS distance of every candidate: rows are candidates, columns are data values
+    in_tail = values[None, :] >= candidates[:, None]
+    empirical = np.cumsum(np.where(in_tail, counts, 0), axis=1) / tail_n[:, None]
+    x = np.broadcast_to(values.astype(np.float64), in_tail.shape)
+    if discrete:
+        theoretical = 1 - zeta(gammas[:, None], x + 1) / zeta(gammas[:, None], candidates[:, None])
+    else:
+        theoretical = 1 - (x / candidates[:, None]) ** (1 - gammas[:, None])
+        # powerlaw compares the continuous CDF with the empirical one just below each value
+        empirical = empirical - np.where(in_tail, counts, 0) / tail_n[:, None]
+    distances = np.where(in_tail, np.abs(empirical - theoretical), 0).max(axis=1)
+    distances[~np.isfinite(gammas)] = np.inf
+    best = int(np.argmin(np.where(valid, distances, np.inf) if valid.any() else distances))
+    return float(gammas[best]), int(candidates[best]) if discrete else float(candidates[best])
+
+
+def _histogram_key(histogram, discrete):
+    return hashlib.sha1(np.asarray(histogram, dtype=np.int64).tobytes()).hexdigest(), discrete
+
+
+def classify_networks(networks, treat_as_social_network=True, workers=1, cache=True):
+    """
+    Classify many networks as random or scale-free with the fast power law fit.
+    Degree histograms are computed once per network; fits are cached per
+    degree histogram and spread across processes.
+
+    :param: networks: iterable of networkX objects or graph_store.CSRGraph.
+            treat_as_social_network: Whether to fit the discrete power law.
+            workers: number of processes the fits are spread across.
+            cache: reuse fits of networks with an identical degree sequence, also across calls.
+    :return: list of dicts with 'gamma', 'xmin' and 'class' (as in netwrok_classifier), in input order.
+    """
+    discrete = treat_as_social_network
+    histograms = [np.bincount(_degrees(G)) for G in networks]
+    keys = [_histogram_key(histogram, discrete) for histogram in histograms]
+    fits = _power_law_fits if cache else {}
+    pending = {}
+    for key, histogram in zip(keys, histograms):
+        if key not in fits:
+            pending.setdefault(key, histogram)
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            fits.update(zip(pending, executor.map(fit_power_law, pending.values(), [discrete] * len(pending))))
+    else:
+        fits.update((key, fit_power_law(histogram, discrete)) for key, histogram in pending.items())
+    fits = [fits[key] for key in keys]
+    return [{'gamma': gamma, 'xmin': xmin, 'class': _gamma_class(gamma)} for gamma, xmin in fits]
+
+if __name__ == '__main__':
+    # Generate a random network with the same number of nodes and edges as the given network
+    given_network = graph_store.load_graphs(NETWORK_FILES['rand_nets_networks'])[0]
+    random_network = nx.gnm_random_graph(given_network.number_of_nodes(), given_network.number_of_edges())
+
+    # Calculate the degree distribution for the given network and the random network
+    given_degrees = given_network.degree().tolist()
+    random_degrees = list(dict(random_network.degree()).values())
 
-# Generate a random network with the same number of nodes and edges as the given network
-given_network = rand_nets_networks[0]
-random_network = nx.gnm_random_graph(given_network.number_of_nodes(), given_network.number_of_edges())
-
-# Calculate the degree distribution for the given network and the random network
-given_degrees = list(dict(given_network.degree()).values())
-random_degrees = list(dict(random_network.degree()).values())
-
-# Plot the QQ plot
-fig, ax = plt.subplots()
-probplot(np.array(given_degrees), dist="norm", plot=ax)
-probplot(np.array(random_degrees), dist="norm", plot=ax)
-ax.legend(["Given network", "Random network"])
-ax.set_title("QQ plot")
-plt.show()
+    # Plot the QQ plot
+    fig, ax = plt.subplots()
+    probplot(np.array(given_degrees), dist="norm", plot=ax)
+    probplot(np.array(random_degrees), dist="norm", plot=ax)
+    ax.legend(["Given network", "Random network"])
+    ax.set_title("QQ plot")
+    plt.show()
 
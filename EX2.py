@@ -1,49 +1,52 @@
+import bisect
+import datetime
 import gzip
 import itertools
 import networkx as nx
 import os
 import csv
+import hashlib
 import json
+import warnings
+import numpy as np
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def community_detector(algorithm_name, network, most_valuable_edge=None):
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+def community_detector(algorithm_name, network, most_valuable_edge=None, patience=None, initial_partition=None):
     partition = None
     modularity_value = -1
     if algorithm_name == 'girvin_newman':
-        communities = list(nx.community.girvan_newman(network, most_valuable_edge))
-        for community in communities:
-            modularity = nx.algorithms.community.modularity(network, community)
+        for community, modularity in girvan_newman_levels(network, most_valuable_edge, patience=patience):
             if modularity > modularity_value:
                 partition = list(community)
                 modularity_value = modularity
         partition = [list(part) for part in partition]
         num_partitions = len(partition)
     elif algorithm_name == 'louvain':
-        community = list(nx.community.louvain_communities(network))
+        if initial_partition is None:
+            community = list(nx.community.louvain_communities(network))
+        else:
+            community = louvain_warm_start(network, initial_partition)
         partition = [list(c) for c in community]
         num_partitions = len(community)
         modularity_value = nx.community.modularity(network, community)
     elif algorithm_name == 'clique_percolation':
-        for k in range(3, max(len(c) for c in nx.find_cliques(network))):
-            community = nx.community.k_clique_communities(network, k)
-            optional_partition = [list(c) for c in community]
+        # levels come from the largest k down; on ties the smallest k wins, as when scanning k upwards
+        for k, optional_partition in clique_percolation_levels(network):
             all_partition_nodes = set(node for c in optional_partition for node in c)
-            for pair in itertools.combinations(optional_partition, 2):
-                shared_node = list(set(pair[0]).intersection(set(pair[1])))
-                if bool(shared_node):
-                    sub_graph0 = network.subgraph(pair[0])
-                    sub_graph1 = network.subgraph(pair[1])
-                    for node in shared_node:
-                        degree_node_0 = sub_graph0.degree(node)
-                        degree_node_1 = sub_graph1.degree(node)
-                        if degree_node_0 <= degree_node_1:
-                            pair[0].remove(node)
-                        else:
-                            pair[1].remove(node)
+            _resolve_overlaps(network, optional_partition)
             for node in network.nodes():
                 if node not in all_partition_nodes:
                     optional_partition.append([node])
             modularity = nx.community.modularity(network, optional_partition)
-            if modularity > modularity_value:
+            if modularity >= modularity_value:
                 modularity_value = modularity
                 partition = optional_partition
         num_partitions = len(partition)
@@ -52,6 +55,492 @@ def community_detector(algorithm_name, network, most_valuable_edge=None):
     return {'num_partitions': num_partitions, 'modularity': modularity_value, 'partition': partition}
 
 
+def _weighted_simple_graph(network, weight):
+    graph = network.__class__()
+    graph.add_nodes_from(network)
+    graph.add_weighted_edges_from(network.edges(data=weight, default=1))
+    return graph
+
+
+def _local_moving(graph, communities, resolution, seed, blocks=None):
+    """
+    Louvain's local moving phase (same gains as networkx' implementation),
+    starting from the given communities instead of singletons. Unlike
+    networkx, a node may also leave for a community of its own, so starting
+    communities can split. With blocks (node -> block id), nodes only join
+    communities of neighbours in their block.
+    """
+    m = graph.size(weight='weight')
+    node2com = {u: i for i, community in enumerate(communities) for u in community}
+    directed = graph.is_directed()
+    if directed:
+        in_degrees = dict(graph.in_degree(weight='weight'))
+        out_degrees = dict(graph.out_degree(weight='weight'))
+        stot_in = defaultdict(float)
+        stot_out = defaultdict(float)
+        for u in graph:
+            stot_in[node2com[u]] += in_degrees[u]
+            stot_out[node2com[u]] += out_degrees[u]
+        nbrs = {u: defaultdict(float) for u in graph}
+        for u, v, wt in graph.edges(data='weight'):
+            if u != v:
+                nbrs[u][v] += wt
+                nbrs[v][u] += wt
+    else:
+        degrees = dict(graph.degree(weight='weight'))
+        stot = defaultdict(float)
+        for u in graph:
+            stot[node2com[u]] += degrees[u]
+        nbrs = {u: {v: data['weight'] for v, data in graph[u].items() if v != u} for u in graph}
+    order = list(graph)
+    seed.shuffle(order)
+    fresh = len(communities)
+    sizes = defaultdict(int, {i: len(community) for i, community in enumerate(communities)})
+    moves = 1
+    while moves > 0:
+        moves = 0
+        for u in order:
+            current = node2com[u]
+            weights2com = defaultdict(float)
+            for v, wt in nbrs[u].items():
+                if blocks is None or blocks[v] == blocks[u]:
+                    weights2com[node2com[v]] += wt
+            if directed:
+                stot_in[current] -= in_degrees[u]
+                stot_out[current] -= out_degrees[u]
+                remove_cost = -weights2com[current] / m + resolution * (out_degrees[u] * stot_in[current] + in_degrees[u] * stot_out[current]) / m ** 2
+            else:
+                stot[current] -= degrees[u]
+                remove_cost = -weights2com[current] / m + resolution * stot[current] * degrees[u] / (2 * m ** 2)
+            # an empty community adds nothing back, so leaving for one gains remove_cost
+            if remove_cost > 0 and sizes[current] > 1:
+                best_gain, best_com = remove_cost, fresh
+            else:
+                best_gain, best_com = 0, current
+            for com, wt in weights2com.items():
+                if directed:
+                    gain = remove_cost + wt / m - resolution * (out_degrees[u] * stot_in[com] + in_degrees[u] * stot_out[com]) / m ** 2
+                else:
+                    gain = remove_cost + wt / m - resolution * stot[com] * degrees[u] / (2 * m ** 2)
+                if gain > best_gain:
+                    best_gain = gain
+                    best_com = com
+            if directed:
+                stot_in[best_com] += in_degrees[u]
+                stot_out[best_com] += out_degrees[u]
+            else:
+                stot[best_com] += degrees[u]
+            if best_com != current:
+                node2com[u] = best_com
+                sizes[current] -= 1
+                sizes[best_com] += 1
+                moves += 1
+                if best_com == fresh:
+                    fresh += 1
+    communities = defaultdict(set)
+    for u, com in node2com.items():
+        communities[com].add(u)
+    return list(communities.values())
+
+
+def _aggregate(graph, communities):
+    node2com = {u: i for i, community in enumerate(communities) for u in community}
+    aggregated = graph.__class__()
+    aggregated.add_nodes_from(range(len(communities)))
+    for u, v, wt in graph.edges(data='weight'):
+        cu, cv = node2com[u], node2com[v]
+        if aggregated.has_edge(cu, cv):
+            aggregated[cu][cv]['weight'] += wt
+        else:
+            aggregated.add_edge(cu, cv, weight=wt)
+    return aggregated
+
+
+def louvain_warm_start(network, initial_partition, resolution=1, seed=None, weight='weight'):
+    """
+    Louvain communities starting from initial_partition rather than singletons:
+    nodes are first moved locally from their initial communities. As Louvain
+    alone can only merge what it starts from, each community is then refined
+    as in Leiden: local moving from singletons, confined to the community,
+    splits it into well-connected pieces. The pieces are aggregated, moved
+    locally starting from the communities they came from (so a piece can leave
+    its community), and networkx' Louvain continues on the aggregated graph.
+    Nodes missing from initial_partition start as singletons and nodes not in
+    network are ignored.
+
+    :return: list of node sets.
+    """
+    seed = nx.utils.create_random_state(seed)
+    graph = _weighted_simple_graph(network, weight)
+    communities = [set(node for node in c if node in graph) for c in initial_partition]
+    communities = [c for c in communities if c]
+    assigned = set().union(*communities) if communities else set()
+    communities += [{node} for node in graph if node not in assigned]
+    if graph.size(weight='weight') == 0:
+        return communities
+    communities = _local_moving(graph, communities, resolution, seed)
+    node2com = {u: i for i, community in enumerate(communities) for u in community}
+    pieces = _local_moving(graph, [{u} for u in graph], resolution, seed, blocks=node2com)
+    aggregated = _aggregate(graph, pieces)
+    grouped = defaultdict(set)
+    for i, piece in enumerate(pieces):
+        grouped[node2com[next(iter(piece))]].add(i)
+    grouped = _local_moving(aggregated, list(grouped.values()), resolution, seed)
+    merged = nx.community.louvain_communities(_aggregate(aggregated, grouped), weight='weight', resolution=resolution, seed=seed)
+    return [set().union(*(pieces[i] for group in part for i in grouped[group])) for part in merged]
+
+
+def _louvain_chain(network, resolutions, seed, weight):
+    """
+    Louvain partitions for the resolutions in order, each warm-started from the previous one.
+    """
+    partitions = []
+    previous = None
+    for resolution in resolutions:
+        if previous is None:
+            previous = nx.community.louvain_communities(network, weight=weight, resolution=resolution, seed=seed)
+        else:
+            previous = louvain_warm_start(network, previous, resolution=resolution, seed=seed, weight=weight)
+        partitions.append(previous)
+    return partitions
+
+
+def louvain_sweep(network, resolutions, seeds=(209505593,), workers=1, weight='weight'):
+    """
+    Run Louvain over a grid of resolutions, once per seed, keeping per resolution
+    the best seed. For every seed the resolutions are visited from the highest
+    down, each warm-started from the partition of the previous (finer) one, as
+    coarsening mostly merges communities. Seeds run in parallel across processes.
+
+    :param: network: networkX object.
+            resolutions: resolution values to try.
+            seeds: seeds of the independent runs, the best of which is kept per resolution.
+            workers: number of processes the seeds are spread across.
+    :return: dict with
+            'curve': per resolution (ascending), a dict with 'resolution', 'modularity' (at resolution 1),
+                     'resolution_modularity' (the objective at that resolution), 'num_partitions',
+                     'partition', 'seed' and 'seed_agreement' (fraction of seeds that found the same partition),
+            'best': the curve entry with the highest modularity.
+    """
+    resolutions = sorted(resolutions, reverse=True)
+    seeds = list(seeds)
+    if workers > 1 and len(seeds) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            chains = list(executor.map(_louvain_chain, [network] * len(seeds), [resolutions] * len(seeds), seeds, [weight] * len(seeds)))
+    else:
+        chains = [_louvain_chain(network, resolutions, seed, weight) for seed in seeds]
+    curve = []
+    for i, resolution in enumerate(resolutions):
+        runs = [(nx.community.modularity(network, chain[i], weight=weight, resolution=resolution), seed, chain[i])
+                for seed, chain in zip(seeds, chains)]
+        objective, seed, partition = max(runs, key=lambda run: run[0])
+        canonical = frozenset(frozenset(c) for c in partition)
+        agreement = sum(frozenset(frozenset(c) for c in run[2]) == canonical for run in runs) / len(runs)
+        curve.append({'resolution': resolution,
+                      'modularity': nx.community.modularity(network, partition, weight=weight),
+                      'resolution_modularity': objective,
+                      'num_partitions': len(partition),
+                      'partition': [list(c) for c in partition],
+                      'seed': seed,
+                      'seed_agreement': agreement})
+    curve.reverse()
+    return {'curve': curve, 'best': max(curve, key=lambda entry: entry['modularity'])}
+
+
+def clique_percolation_levels(network, min_k=3):
+    """
+    k-clique communities (as nx.community.k_clique_communities) for every k from
+    the largest clique size - 1 down to min_k, from a single enumeration of the
+    maximal cliques. Clique adjacencies only appear as k decreases, so the
+    percolation is maintained incrementally with a union-find over cliques.
+
+    :return: generator of (k, list of communities as node lists), k descending.
+    """
+    cliques = [frozenset(c) for c in nx.find_cliques(network)]
+    if not cliques:
+        return
+    max_k = max(len(c) for c in cliques)
+    members = defaultdict(list)
+    for i, clique in enumerate(cliques):
+        if len(clique) >= min_k:
+            for node in clique:
+                members[node].append(i)
+    overlaps = defaultdict(int)
+    for indices in members.values():
+        for pair in itertools.combinations(indices, 2):
+            overlaps[pair] += 1
+    # two cliques percolate at every k up to min(their sizes, overlap + 1)
+    activations = defaultdict(list)
+    for (a, b), overlap in overlaps.items():
+        activations[min(len(cliques[a]), len(cliques[b]), overlap + 1)].append((a, b))
+    by_size = defaultdict(list)
+    for i, clique in enumerate(cliques):
+        by_size[len(clique)].append(i)
+
+    parent = {}
+    nodes = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for k in range(max_k, min_k - 1, -1):
+        for i in by_size[k]:
+            parent[i] = i
+            nodes[i] = set(cliques[i])
+        for a, b in activations[k]:
+            a, b = sorted((find(a), find(b)))
+            if a != b:
+                # the root is the lowest clique index, which orders the communities as networkx does
+                parent[b] = a
+                small, large = sorted((nodes.pop(a), nodes.pop(b)), key=len)
+                large |= small
+                nodes[a] = large
+        if k < max_k:
+            yield k, [list(nodes[root]) for root in sorted(nodes)]
+
+
+def _resolve_overlaps(network, communities):
+    """
+    Assign every node shared by two communities to the one where it has the higher
+    degree (ties go to the later one), visiting community pairs in
+    itertools.combinations order but only those that actually share nodes.
+    Community lists are edited in place.
+    """
+    index = defaultdict(list)
+    for i, community in enumerate(communities):
+        for node in community:
+            index[node].append(i)
+    shared = defaultdict(list)
+    for node, owners in index.items():
+        for pair in itertools.combinations(owners, 2):
+            shared[pair].append(node)
+    members = [set(community) for community in communities]
+
+    def inner_degree(node, community):
+        return sum(2 if neighbor == node else 1 for neighbor in network[node] if neighbor in community)
+
+    for i, j in sorted(shared):
+        first, second = set(members[i]), set(members[j])
+        for node in shared[i, j]:
+            if node in first and node in second:
+                if inner_degree(node, first) <= inner_degree(node, second):
+                    members[i].discard(node)
+                else:
+                    members[j].discard(node)
+    for community, kept in zip(communities, members):
+        community[:] = [node for node in community if node in kept]
+
+
+def _community_stats(network, nodes, weight):
+    """
+    Internal edge weight and out/in weighted degree sums of a node set in the
+    original network, as used by nx.community.modularity.
+    """
+    internal = sum(w for u, v, w in network.edges(nodes, data=weight, default=1) if v in nodes)
+    if network.is_directed():
+        return internal, network.out_degree(nodes, weight=weight), network.in_degree(nodes, weight=weight)
+    degree = sum(d for _, d in network.degree(nodes, weight=weight))
+    return internal, degree, degree
+
+
+def _degree_sum(degrees):
+    return degrees if isinstance(degrees, (int, float)) else sum(d for _, d in degrees)
+
+
+class _ModularityTracker:
+    """
+    Modularity of a partition of network, updated in time proportional to the
+    volume of the smaller part whenever a community splits in two.
+    """
+
+    def __init__(self, network, communities, weight='weight'):
+        self.network = network
+        self.weight = weight
+        if network.is_directed():
+            self.m = network.size(weight=weight)
+            self.norm = 1 / self.m ** 2 if self.m else 0
+        else:
+            self.m = network.size(weight=weight)
+            self.norm = 1 / (2 * self.m) ** 2 if self.m else 0
+        self.stats = {}
+        self.value = 0
+        for community in communities:
+            self.add(frozenset(community), self._stats(community))
+
+    def _stats(self, nodes):
+        internal, out_degree, in_degree = _community_stats(self.network, nodes, self.weight)
+        return internal, _degree_sum(out_degree), _degree_sum(in_degree)
+
+    def _contribution(self, stats):
+        internal, out_degree, in_degree = stats
+        return (internal / self.m if self.m else 0) - out_degree * in_degree * self.norm
+
+    def add(self, community, stats):
+        self.stats[community] = stats
+        self.value += self._contribution(stats)
+
+    def split(self, community, small):
+        """
+        Replace community by small and community - small, scanning only small.
+        """
+        internal, out_degree, in_degree = self.stats.pop(community)
+        self.value -= self._contribution((internal, out_degree, in_degree))
+        rest = community - small
+        small_internal, small_out, small_in = self._stats(small)
+        # edge weight between the two parts, in both directions for digraphs
+        cut = sum(w for u, v, w in self.network.edges(small, data=self.weight, default=1) if v in rest)
+        if self.network.is_directed():
+            cut += sum(w for u, v, w in self.network.in_edges(small, data=self.weight, default=1) if u in rest)
+        self.add(small, (small_internal, small_out, small_in))
+        self.add(rest, (internal - small_internal - cut, out_degree - small_out, in_degree - small_in))
+        return small, rest
+
+
+def _split_sides(g, u, v):
+    """
+    After removing edge (u, v) from g, grow BFS from u and v in lockstep.
+    Returns the node set of the side that was exhausted first when they are
+    disconnected, or None when they are still connected.
+    """
+    seen = ({u}, {v})
+    frontiers = ([u], [v])
+    while frontiers[0] and frontiers[1]:
+        for side in (0, 1):
+            next_frontier = []
+            for node in frontiers[side]:
+                for neighbor in g[node]:
+                    if neighbor in seen[1 - side]:
+                        return None
+                    if neighbor not in seen[side]:
+                        seen[side].add(neighbor)
+                        next_frontier.append(neighbor)
+            frontiers[side][:] = next_frontier
+    return seen[0] if not frontiers[0] else seen[1]
+
+
+def _component_edge_betweenness(g, component, weight=None):
+    """
+    Raw (unscaled) edge betweenness sums of one connected component of g, keyed
+    as in g.edges(). Sources and neighbours are taken in g's order and summed as
+    nx.edge_betweenness_centrality does, so every value is bit for bit the one
+    it computes over the whole of g, before rescaling.
+    """
+    if weight is not None:
+        # a view filtering g keeps its node and adjacency order
+        view = nx.subgraph_view(g, filter_node=component.__contains__)
+        half = nx.edge_betweenness_centrality(view, normalized=False, weight=weight)
+        return {edge: 2 * value for edge, value in half.items()}
+    sources = [node for node in g if node in component]
+    betweenness = dict.fromkeys(g.edges(sources), 0.0)
+    for s in sources:
+        stack = []
+        predecessors = {s: []}
+        sigma = {s: 1.0}
+        distance = {s: 0}
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            stack.append(v)
+            next_distance = distance[v] + 1
+            sigma_v = sigma[v]
+            for w in g[v]:
+                if w not in distance:
+                    queue.append(w)
+                    distance[w] = next_distance
+                    sigma[w] = 0.0
+                    predecessors[w] = []
+                if distance[w] == next_distance:
+                    sigma[w] += sigma_v
+                    predecessors[w].append(v)
+        delta = dict.fromkeys(stack, 0)
+        while stack:
+            w = stack.pop()
+            coeff = (1 + delta[w]) / sigma[w]
+            for v in predecessors[w]:
+                c = sigma[v] * coeff
+                if (v, w) in betweenness:
+                    betweenness[v, w] += c
+                else:
+                    betweenness[w, v] += c
+                delta[v] += c
+    return betweenness
+
+
+def girvan_newman_levels(network, most_valuable_edge=None, weight=None, patience=None, tolerance=1e-12):
+    """
+    Girvan-Newman levels (as nx.community.girvan_newman), streamed lazily with their modularity.
+
+    Without most_valuable_edge, edge betweenness is kept per connected component
+    and recomputed only for the component that lost an edge; its sums equal the
+    whole-graph ones bit for bit and ties go to the first edge in g.edges()
+    order, so the levels are those of nx.community.girvan_newman (with weight,
+    of it with a weighted betweenness selector). Modularity against
+    network is updated incrementally as communities split. With patience set,
+    iteration stops once modularity stayed more than tolerance below its best
+    value for patience consecutive levels.
+
+    :return: generator of (tuple of node sets, modularity).
+    """
+    g = network.copy().to_undirected()
+    g.remove_edges_from(nx.selfloop_edges(g))
+    components = [frozenset(c) for c in nx.connected_components(g)]
+    tracker = _ModularityTracker(network, components)
+    component_of = {node: c for c in components for node in c}
+    betweenness = {}
+
+    def local_betweenness(component):
+        betweenness[component] = _component_edge_betweenness(g, component, weight)
+
+    def most_central_edge():
+        # nx.community.girvan_newman takes the first maximum, in g.edges() order, of the
+        # raw sums times its normalization
+        scale = 1 / (len(g) * (len(g) - 1))
+        best_edge, best = None, -1.0
+        for u, v in g.edges():
+            value = betweenness[component_of[u]][u, v] * scale
+            if value > best:
+                best_edge, best = (u, v), value
+        return best_edge
+
+    if most_valuable_edge is None:
+        for component in components:
+            local_betweenness(component)
+
+    best = -float('inf')
+    worse_levels = 0
+    while g.number_of_edges() > 0:
+        num_components = len(tracker.stats)
+        while len(tracker.stats) <= num_components and g.number_of_edges() > 0:
+            if most_valuable_edge is None:
+                u, v = most_central_edge()
+            else:
+                u, v = most_valuable_edge(g)
+            g.remove_edge(u, v)
+            component = component_of[u]
+            small = _split_sides(g, u, v)
+            parts = [component] if small is None else tracker.split(component, frozenset(small))
+            if small is not None:
+                for part in parts:
+                    for node in part:
+                        component_of[node] = part
+            if most_valuable_edge is None:
+                del betweenness[component]
+                for part in parts:
+                    local_betweenness(part)
+        modularity = tracker.value
+        yield tuple(set(c) for c in tracker.stats), modularity
+        if modularity > best + tolerance:
+            best = modularity
+            worse_levels = 0
+        elif patience is not None and modularity < best - tolerance:
+            worse_levels += 1
+            if worse_levels >= patience:
+                return
+
+
 def edge_selector_optimizer(G):
     edge_betweenness = nx.edge_betweenness_centrality(G, weight='weight')
     sorted_edges = sorted(edge_betweenness.items(), key=lambda x: x[1], reverse=True)
@@ -59,79 +548,546 @@ def edge_selector_optimizer(G):
     return max_edge
 
 
-def construct_heb_edges(files_path, start_date='2019-03-15', end_date='2019-04-15', non_parliamentarians_nodes=0):
+def _partial_edge_betweenness(G, sources, weight):
+    return nx.edge_betweenness_centrality_subset(G, sources, list(G), normalized=False, weight=weight)
+
+
+class EdgeSelector:
+    """
+    most_valuable_edge callback for Girvan-Newman picking the edge of highest
+    (weighted) edge betweenness, like edge_selector_optimizer.
+
+    With k set, betweenness is estimated from k sampled pivot sources (seeded
+    by seed). Otherwise it is exact, and with workers > 1 Brandes' per-source
+    accumulation is split across a process pool that lives until close().
+    """
+
+    def __init__(self, weight='weight', k=None, seed=None, workers=1):
+        self.weight = weight
+        self.k = k
+        self.seed = seed
+        self.workers = workers
+        self._executor = None
+
+    def betweenness(self, G):
+        if self.k is not None and self.k < len(G):
+            return nx.edge_betweenness_centrality(G, k=self.k, normalized=False, weight=self.weight, seed=self.seed)
+        if self.workers <= 1 or len(G) < 2 * self.workers:
+            return nx.edge_betweenness_centrality(G, normalized=False, weight=self.weight)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        nodes = list(G)
+        chunks = [nodes[i::self.workers] for i in range(self.workers)]
+        partials = self._executor.map(_partial_edge_betweenness, [G] * len(chunks), chunks, [self.weight] * len(chunks))
+        betweenness = dict.fromkeys(G.edges(), 0.0)
+        for partial in partials:
+            for edge, value in partial.items():
+                betweenness[edge] += value
+        return betweenness
+
+    def __call__(self, G):
+        betweenness = self.betweenness(G)
+        return max(betweenness, key=betweenness.get)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _central_players(files_path, start_date):
     if '2019' in start_date:
         central_players_file = os.path.join(files_path, 'central_political_players_2019.csv')
     else:
         central_players_file = os.path.join(files_path, 'central_political_players_2022.csv')
-    central_players = []
+    central_players = set()
     with open(central_players_file, 'r') as csvfile:
         csvreader = csv.reader(csvfile)
         next(csvreader)  # skip header row
         for row in csvreader:
-            central_players.append(row[0])
+            central_players.add(row[0])
+    return central_players
+
+
+def _open_tweets(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
 
-    edges_dict = {}
+
+def _tweet_files(files_path, start_date, end_date):
+    # date order, so the non_parliamentarians_nodes budget is spent reproducibly
+    files = []
     for filename in os.listdir(files_path):
-        if filename.endswith('.txt'):
-            try:
-                date_str = filename.split('.')[2]
-                if start_date <= date_str <= end_date:
-                    with open(os.path.join(files_path, filename), 'r', encoding='utf-8') as file:
-                        for line in file:
-                            tweet = json.loads(line)
-                            if 'retweeted_status' in tweet:
-                                original_tweeter_id = tweet['retweeted_status']['user']['id_str'] #who is tweeted the original post
-                                retweeted_id = tweet['user']['id_str']  #who is retweet the post
-                                if retweeted_id in central_players and original_tweeter_id in central_players:
-                                    edge = (retweeted_id, original_tweeter_id)
-                                    edges_dict[edge] = edges_dict.get(edge, 0) + 1
-                                else:
-                                    if non_parliamentarians_nodes > 0:
-                                        all_node = []
-                                        for key in edges_dict.keys():
-                                            all_node.append(key[0])
-                                            all_node.append(key[1])
-                                        if retweeted_id in central_players and original_tweeter_id not in central_players:
-                                            if original_tweeter_id not in all_node and retweeted_id in all_node:
-                                                edge = (retweeted_id, original_tweeter_id)
-                                                edges_dict[edge] = edges_dict.get(edge, 0) + 1
-                                                non_parliamentarians_nodes -= 1
-                                        else:
-                                            continue
-            except:
-                continue
-        elif filename.endswith('.gz'):
+        if filename.endswith('.txt') or filename.endswith('.gz'):
+            parts = filename.split('.')
+            if len(parts) > 2 and start_date <= parts[2] <= end_date:
+                files.append((parts[2], filename))
+    return [os.path.join(files_path, filename) for _, filename in sorted(files)]
+
+
+def _retweets(file, counts):
+    """
+    Yield (retweeted_id, original_tweeter_id) for every retweet in a dump.
+    Lines that don't mention retweeted_status are skipped before decoding, as
+    are tweets whose top-level retweeted_status is missing or null; lines that
+    fail to decode or lack a user id_str are counted as malformed.
+    """
+    for line in file:
+        counts['lines'] += 1
+        if '"retweeted_status"' not in line:
+            continue
+        try:
+            tweet = _json_loads(line)
+        except ValueError:
+            counts['malformed'] += 1
+            continue
+        if not isinstance(tweet, dict):
+            counts['malformed'] += 1
+            continue
+        retweeted_status = tweet.get('retweeted_status')
+        if retweeted_status is None:
+            continue
+        try:
+            original_tweeter_id = retweeted_status['user']['id_str'] #who is tweeted the original post
+            retweeted_id = tweet['user']['id_str']  #who is retweet the post
+        except (KeyError, TypeError):
+            counts['malformed'] += 1
+            continue
+        counts['retweets'] += 1
+        yield retweeted_id, original_tweeter_id
+
+
+class _EdgeCollector:
+    """
+    Accumulates retweet edges between central players and, while the budget of
+    non_parliamentarians_nodes lasts, edges from a central player already in the
+    network to a non-central original tweeter not yet in it.
+    """
+
+    def __init__(self, central_players, non_parliamentarians_nodes=0):
+        self.central_players = central_players
+        self.budget = non_parliamentarians_nodes
+        self.edges = {}
+        self.nodes = set()
+
+    @property
+    def ordered(self):
+        # while the budget lasts, the order of retweets decides which edges get in
+        return self.budget > 0
+
+    def add(self, retweeted_id, original_tweeter_id, count=1):
+        central = self.central_players
+        if retweeted_id in central and original_tweeter_id in central:
+            edge = (retweeted_id, original_tweeter_id)
+            self.edges[edge] = self.edges.get(edge, 0) + count
+            self.nodes.add(retweeted_id)
+            self.nodes.add(original_tweeter_id)
+        elif self.budget > 0 and retweeted_id in central and original_tweeter_id not in central:
+            if original_tweeter_id not in self.nodes and retweeted_id in self.nodes:
+                edge = (retweeted_id, original_tweeter_id)
+                self.edges[edge] = self.edges.get(edge, 0) + 1
+                self.nodes.add(original_tweeter_id)
+                self.budget -= 1
+
+    def merge(self, partial):
+        if partial.events is not None:
+            for retweeted_id, original_tweeter_id in partial.events:
+                self.add(retweeted_id, original_tweeter_id)
+            return
+        for edge, count in partial.edges.items():
+            self.edges[edge] = self.edges.get(edge, 0) + count
+            self.nodes.update(edge)
+
+
+class _FilePartial:
+    """
+    Result of scanning one file independently: counts of the edges between
+    central players and, when a budget of non-central nodes is in play, the
+    ordered retweets by central players, which are replayed when reducing
+    since the budget depends on what earlier files added.
+    """
+
+    def __init__(self, central_players, keep_events):
+        self.central_players = central_players
+        self.edges = {}
+        self.events = [] if keep_events else None
+
+    @property
+    def ordered(self):
+        return self.events is not None
+
+    def add(self, retweeted_id, original_tweeter_id, count=1):
+        central = self.central_players
+        if retweeted_id in central:
+            if self.events is not None:
+                self.events.append((retweeted_id, original_tweeter_id))
+            elif original_tweeter_id in central:
+                edge = (retweeted_id, original_tweeter_id)
+                self.edges[edge] = self.edges.get(edge, 0) + count
+
+
+class _FileRetweets:
+    """
+    Every retweet of one dump, independent of any player list: the distinct
+    (retweeted_id, original_tweeter_id) pairs with their counts, plus the
+    sequence of pair indices in file order for replays that depend on order.
+    """
+
+    # bumped whenever _retweets parses differently, so older cache entries are rescanned
+    VERSION = 2
+
+    def __init__(self, users=None, pairs=None, counts=None, order=None, stats=None):
+        self.users = [] if users is None else users
+        self.pairs = [] if pairs is None else pairs
+        self.counts = [] if counts is None else counts
+        self.order = [] if order is None else order
+        self.stats = stats
+        self._user_index = {}
+        self._pair_index = {}
+
+    def add(self, retweeted_id, original_tweeter_id, count=1):
+        ids = []
+        for user in (retweeted_id, original_tweeter_id):
+            if user not in self._user_index:
+                self._user_index[user] = len(self.users)
+                self.users.append(user)
+            ids.append(self._user_index[user])
+        pair = tuple(ids)
+        if pair not in self._pair_index:
+            self._pair_index[pair] = len(self.pairs)
+            self.pairs.append(pair)
+            self.counts.append(0)
+        index = self._pair_index[pair]
+        self.counts[index] += count
+        self.order.append(index)
+
+    def replay(self, collector):
+        users = list(self.users)
+        pairs = [(users[u], users[v]) for u, v in self.pairs]
+        if collector.ordered:
+            for index in self.order:
+                collector.add(*pairs[index])
+        else:
+            for (retweeted_id, original_tweeter_id), count in zip(pairs, self.counts):
+                collector.add(retweeted_id, original_tweeter_id, int(count))
+
+    def save(self, target, size, mtime_ns):
+        tmp = target + '.tmp%d' % os.getpid()
+        with open(tmp, 'wb') as f:
+            np.savez(f, users=np.array(self.users, dtype=str), pairs=np.array(self.pairs, dtype=np.int64).reshape(-1, 2),
+                     counts=np.array(self.counts, dtype=np.int64), order=np.array(self.order, dtype=np.int64),
+                     stats=np.array([self.stats['lines'], self.stats['retweets'], self.stats['malformed'], self.stats['unreadable']]),
+                     source=np.array([size, mtime_ns], dtype=np.int64), version=np.array(self.VERSION))
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, target, size, mtime_ns):
+        """
+        :return: the cached _FileRetweets, or None when missing or made from another version of the file or cache.
+        """
+        try:
+            with np.load(target) as data:
+                if data['source'].tolist() != [size, mtime_ns] or int(data['version']) != cls.VERSION:
+                    return None
+                lines, retweets, malformed, unreadable = data['stats'].tolist()
+                stats = {'lines': lines, 'retweets': retweets, 'malformed': malformed, 'unreadable': bool(unreadable)}
+                record = cls(data['users'].tolist(), data['pairs'].tolist(), data['counts'].tolist(), data['order'], stats)
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(target)  # mark as recently used for trimming
+        return record
+
+
+def _edge_cache_path(cache_dir, path):
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest() + '.npz')
+
+
+def _cached_file_retweets(path, cache_dir, max_cache_bytes):
+    status = os.stat(path)
+    target = _edge_cache_path(cache_dir, path)
+    record = _FileRetweets.load(target, status.st_size, status.st_mtime_ns)
+    if record is None:
+        record = _FileRetweets()
+        _, record.stats = _scan_tweet_file(path, record)
+        os.makedirs(cache_dir, exist_ok=True)
+        record.save(target, status.st_size, status.st_mtime_ns)
+        if max_cache_bytes is not None:
+            trim_edge_cache(cache_dir, max_cache_bytes)
+    return record
+
+
+def trim_edge_cache(cache_dir, max_cache_bytes):
+    """
+    Delete the least recently used per-file entries until the cache is at most max_cache_bytes.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.npz'):
             try:
-                date_str = filename.split('.')[2]
-                if start_date <= date_str <= end_date:
-                    with gzip.open(os.path.join(files_path, filename), 'rt', encoding='utf-8') as file:
-                        for line in file:
-                            tweet = json.loads(line)
-                            if 'retweeted_status' in tweet:
-                                original_tweeter_id = tweet['retweeted_status']['user']['id_str'] #who is tweeted the original post
-                                retweeted_id = tweet['user']['id_str']  #who is retweet the post
-                                if 'user' not in tweet:
-                                    continue
-                                if retweeted_id in central_players and original_tweeter_id in central_players:
-                                    edge = (retweeted_id, original_tweeter_id)
-                                    edges_dict[edge] = edges_dict.get(edge, 0) + 1
-                                else:
-                                    if non_parliamentarians_nodes > 0:
-                                        all_node = []
-                                        for key in edges_dict.keys():
-                                            all_node.append(key[0])
-                                            all_node.append(key[1])
-                                        if retweeted_id in central_players and original_tweeter_id not in central_players:
-                                            if original_tweeter_id not in all_node and retweeted_id in all_node:
-                                                edge = (retweeted_id, original_tweeter_id)
-                                                edges_dict[edge] = edges_dict.get(edge, 0) + 1
-                                                non_parliamentarians_nodes -= 1
-                                        else:
-                                            continue
-            except:
+                status = os.stat(os.path.join(cache_dir, name))
+            except FileNotFoundError:
                 continue
-    return edges_dict
+            entries.append((status.st_mtime_ns, status.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_cache_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def clear_edge_cache(cache_dir, files_path=None):
+    """
+    Remove the cached entries of every dump under files_path, or the whole cache when files_path is None.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    if files_path is None:
+        names = [name for name in os.listdir(cache_dir) if name.endswith('.npz')]
+    else:
+        names = [os.path.basename(_edge_cache_path(cache_dir, os.path.join(files_path, filename))) for filename in os.listdir(files_path)]
+    for name in names:
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def _scan_tweet_file(path, collector, cache_dir=None, max_cache_bytes=None):
+    if cache_dir is not None:
+        record = _cached_file_retweets(path, cache_dir, max_cache_bytes)
+        record.replay(collector)
+        return collector, record.stats
+    counts = {'lines': 0, 'retweets': 0, 'malformed': 0, 'unreadable': False}
+    try:
+        with _open_tweets(path) as file:
+            for retweeted_id, original_tweeter_id in _retweets(file, counts):
+                collector.add(retweeted_id, original_tweeter_id)
+    except (OSError, EOFError, UnicodeDecodeError):
+        # truncated or corrupt dump: keep what was read before the failure
+        counts['unreadable'] = True
+    return collector, counts
+
+
+def _add_counts(stats, path, counts):
+    for key in ('lines', 'retweets', 'malformed'):
+        stats[key] += counts[key]
+    if counts['malformed']:
+        stats['malformed_by_file'][os.path.basename(path)] = counts['malformed']
+    if counts['unreadable']:
+        stats['unreadable_files'].append(os.path.basename(path))
+
+
+_worker_central_players = None
+
+
+def _init_tweet_worker(central_players):
+    global _worker_central_players
+    _worker_central_players = central_players
+
+
+def _map_tweet_file(path, keep_events, cache_dir, max_cache_bytes):
+    return _scan_tweet_file(path, _FilePartial(_worker_central_players, keep_events), cache_dir, max_cache_bytes)
+
+
+def _warn_malformed(stats):
+    if stats['malformed'] or stats['unreadable_files']:
+        warnings.warn(f"skipped {stats['malformed']} malformed lines in {len(stats['malformed_by_file'])} files; "
+                      f"{len(stats['unreadable_files'])} files could not be read to the end")
+
+
+def _report(progress, done, total, path):
+    if callable(progress):
+        progress(done, total, path)
+    elif progress:
+        print(f'{done}/{total} {os.path.basename(path)}')
+
+
+def construct_heb_edges(files_path, start_date='2019-03-15', end_date='2019-04-15', non_parliamentarians_nodes=0, workers=1, progress=False, stats=None,
+                        cache_dir=None, max_cache_bytes=None):
+    """
+    With workers > 1 the daily files are scanned in a process pool and the
+    per-file partial results are reduced in date order, giving the same edges
+    as the sequential scan. progress is True to print, or a callable taking
+    (files done, total files, path). If stats is a dict, it is filled with the
+    number of lines, retweets and malformed lines read, malformed lines per
+    file and the files that could not be read to the end.
+    With cache_dir set, every dump is parsed once into a per-file cache of
+    retweet pairs with counts (keyed on path, size and mtime) that later calls
+    with any date window or player list read instead; max_cache_bytes bounds
+    its size by evicting the least recently used entries.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'files': 0, 'lines': 0, 'retweets': 0, 'malformed': 0, 'malformed_by_file': {}, 'unreadable_files': []})
+    central_players = _central_players(files_path, start_date)
+    collector = _EdgeCollector(central_players, non_parliamentarians_nodes)
+    paths = _tweet_files(files_path, start_date, end_date)
+    stats['files'] = len(paths)
+    if workers <= 1:
+        for done, path in enumerate(paths, 1):
+            _, counts = _scan_tweet_file(path, collector, cache_dir, max_cache_bytes)
+            _add_counts(stats, path, counts)
+            _report(progress, done, len(paths), path)
+        _warn_malformed(stats)
+        return collector.edges
+    keep_events = non_parliamentarians_nodes > 0
+    with ProcessPoolExecutor(workers, initializer=_init_tweet_worker, initargs=(central_players,)) as executor:
+        futures = {executor.submit(_map_tweet_file, path, keep_events, cache_dir, max_cache_bytes): i for i, path in enumerate(paths)}
+        partials = {}
+        next_index = 0
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            partials[i], counts = future.result()
+            _add_counts(stats, paths[i], counts)
+            _report(progress, done, len(paths), paths[i])
+            # reduce every partial whose predecessors are all merged
+            while next_index in partials:
+                collector.merge(partials.pop(next_index))
+                next_index += 1
+    _warn_malformed(stats)
+    return collector.edges
+
+
+class RetweetIndex:
+    """
+    Per-day retweet pair counts of every dump under files_path, built once (from
+    the per-file cache when cache_dir is given). Days are kept in date order with
+    day_ptr as the prefix sums of their entry counts, so a date-range query only
+    reads the entries of the days in the range.
+    """
+
+    def __init__(self, files_path, start_date='', end_date='\uffff', cache_dir=None, max_cache_bytes=None):
+        self.files_path = files_path
+        self.users = []
+        user_index = {}
+        pair_index = {}
+        pairs = []
+        days = []
+        day_pairs, day_counts = [], []
+        events = []
+        for path in _tweet_files(files_path, start_date, end_date):
+            if cache_dir is not None:
+                record = _cached_file_retweets(path, cache_dir, max_cache_bytes)
+            else:
+                record = _FileRetweets()
+                _scan_tweet_file(path, record)
+            users = []
+            for user in record.users:
+                if user not in user_index:
+                    user_index[user] = len(self.users)
+                    self.users.append(user)
+                users.append(user_index[user])
+            to_global = []
+            for u, v in record.pairs:
+                pair = (users[u], users[v])
+                if pair not in pair_index:
+                    pair_index[pair] = len(pairs)
+                    pairs.append(pair)
+                to_global.append(pair_index[pair])
+            to_global = np.array(to_global, dtype=np.int64)
+            day = os.path.basename(path).split('.')[2]
+            if not days or days[-1] != day:
+                days.append(day)
+                day_pairs.append([])
+                day_counts.append([])
+                events.append([])
+            day_pairs[-1].append(to_global)
+            day_counts[-1].append(np.asarray(record.counts, dtype=np.int64))
+            events[-1].append(to_global[np.asarray(record.order, dtype=np.int64)])
+        self.days = days
+        self.user_index = user_index
+        self.pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        self.day_pairs, self.day_counts, self.day_ptr = self._concatenate(day_pairs, day_counts)
+        self.events = np.concatenate([np.concatenate(e) for e in events]) if events else np.empty(0, dtype=np.int64)
+        self.event_ptr = np.concatenate([[0], np.cumsum([sum(len(x) for x in e) for e in events])]).astype(np.int64)
+
+    @staticmethod
+    def _concatenate(day_pairs, day_counts):
+        # merge the files of each day into one entry per pair, in first-appearance order
+        merged_pairs, merged_counts, sizes = [], [], []
+        for pairs, counts in zip(day_pairs, day_counts):
+            pairs = np.concatenate(pairs)
+            counts = np.concatenate(counts)
+            unique, first, inverse = np.unique(pairs, return_index=True, return_inverse=True)
+            totals = np.bincount(inverse, weights=counts).astype(np.int64)
+            order = np.argsort(first, kind='stable')
+            merged_pairs.append(unique[order])
+            merged_counts.append(totals[order])
+            sizes.append(len(unique))
+        ptr = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        if not merged_pairs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), ptr
+        return np.concatenate(merged_pairs), np.concatenate(merged_counts), ptr
+
+    def _day_range(self, start_date, end_date):
+        return bisect.bisect_left(self.days, start_date), bisect.bisect_right(self.days, end_date)
+
+    def edges(self, start_date='2019-03-15', end_date='2019-04-15', non_parliamentarians_nodes=0, central_players=None):
+        """
+        Same edge dict as construct_heb_edges for the date range, without rescanning any dump.
+        """
+        if central_players is None:
+            central_players = _central_players(self.files_path, start_date)
+        lo, hi = self._day_range(start_date, end_date)
+        collector = _EdgeCollector(central_players, non_parliamentarians_nodes)
+        if collector.ordered:
+            for index in self.events[self.event_ptr[lo]:self.event_ptr[hi]].tolist():
+                u, v = self.pairs[index]
+                collector.add(self.users[u], self.users[v])
+            return collector.edges
+        central = np.zeros(len(self.users), dtype=bool)
+        central[[self.user_index[user] for user in central_players if user in self.user_index]] = True
+        pair_ids = self.day_pairs[self.day_ptr[lo]:self.day_ptr[hi]]
+        counts = self.day_counts[self.day_ptr[lo]:self.day_ptr[hi]]
+        keep = central[self.pairs[pair_ids, 0]] & central[self.pairs[pair_ids, 1]]
+        pair_ids, counts = pair_ids[keep], counts[keep]
+        unique, first, inverse = np.unique(pair_ids, return_index=True, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts).astype(np.int64)
+        edges = {}
+        for i in np.argsort(first, kind='stable').tolist():
+            u, v = self.pairs[unique[i]]
+            edges[(self.users[u], self.users[v])] = int(totals[i])
+        return edges
+
+
+def sliding_window_communities(index, start_date, end_date, window_days, step_days=None, algorithm_name='louvain',
+                               non_parliamentarians_nodes=0, **detector_kwargs):
+    """
+    Run community_detector on the retweet network of every window of
+    window_days days, starting every step_days days (default: window_days)
+    between start_date and end_date. Each window is warm-started from the
+    previous window's partition (used by the louvain algorithm).
+
+    :param: index: RetweetIndex over the data directory.
+    :return: generator of dicts with 'start_date', 'end_date', 'network' and 'result'
+             ('result' is None for windows without edges).
+    """
+    step_days = step_days or window_days
+    first = datetime.date.fromisoformat(start_date)
+    last = datetime.date.fromisoformat(end_date)
+    previous = None
+    window_start = first
+    while window_start <= last:
+        window_end = min(window_start + datetime.timedelta(days=window_days - 1), last)
+        edges = index.edges(window_start.isoformat(), window_end.isoformat(), non_parliamentarians_nodes)
+        network = construct_heb_network(edges)
+        result = None
+        if network.number_of_edges() > 0:
+            result = community_detector(algorithm_name, network, initial_partition=previous, **detector_kwargs)
+            previous = result['partition']
+        yield {'start_date': window_start.isoformat(), 'end_date': window_end.isoformat(), 'network': network, 'result': result}
+        window_start += datetime.timedelta(days=step_days)
 
 
 def construct_heb_network(edge_dict):
@@ -157,6 +1113,8 @@ if __name__ == '__main__':
     # question 2
     print('//question 2//')
     files_path = '/Users/lidarbut/PycharmProjects/HW2/all_data'
+    # the data directory is scanned four times below; parse every dump only once
+    cache_dir = os.path.join(files_path, '.edge_cache')
     central_players_2019 = os.path.join(files_path, 'central_political_players_2019.csv')
     dict_central_players_2019 = {}
     with open(central_players_2019, 'r') as csvfile:
@@ -165,7 +1123,7 @@ if __name__ == '__main__':
         for row in csvreader:
             dict_central_players_2019[row[0]] = row[1]
     print('network1')
-    edges_network1 = construct_heb_edges(files_path)
+    edges_network1 = construct_heb_edges(files_path, cache_dir=cache_dir)
     network1 = construct_heb_network(edges_network1)
     print('without more nodes', network1.number_of_nodes())
     dict_result_network1 = community_detector('girvin_newman', network1, edge_selector_optimizer)
@@ -177,7 +1135,7 @@ if __name__ == '__main__':
     for partition in dict_result_network1['partition']:
         print(partition)
     print('network2 - with 50 non_parliamentarians_nodes')
-    edges_network2 = construct_heb_edges(files_path, non_parliamentarians_nodes=50)
+    edges_network2 = construct_heb_edges(files_path, non_parliamentarians_nodes=50, cache_dir=cache_dir)
     network2 = construct_heb_network(edges_network2)
     dict_result_network2 = community_detector('girvin_newman', network2, edge_selector_optimizer)
     print('Number of partition: ', dict_result_network2['num_partitions'])
@@ -195,7 +1153,7 @@ if __name__ == '__main__':
         for row in csvreader:
             dict_central_players_2022[row[0]] = row[1]
     print('network1')
-    edges_network_2022 = construct_heb_edges(files_path, start_date='2022-10-01', end_date='2022-10-31')
+    edges_network_2022 = construct_heb_edges(files_path, start_date='2022-10-01', end_date='2022-10-31', cache_dir=cache_dir)
     network_2022 = construct_heb_network(edges_network_2022)
     dict_result_network_2022 = community_detector('girvin_newman', network_2022, edge_selector_optimizer)
     print('Number of partition: ', dict_result_network_2022['num_partitions'])
@@ -206,7 +1164,7 @@ if __name__ == '__main__':
     for partition in dict_result_network_2022['partition']:
         print(partition)
     print('network2 - with 50 non_parliamentarians_nodes')
-    edges_network_2022_extra = construct_heb_edges(files_path, start_date='2022-10-01', end_date='2022-10-31', non_parliamentarians_nodes=50)
+    edges_network_2022_extra = construct_heb_edges(files_path, start_date='2022-10-01', end_date='2022-10-31', non_parliamentarians_nodes=50, cache_dir=cache_dir)
     network_2022_extra = construct_heb_network(edges_network_2022_extra)
     dict_result_network_2022_extra = community_detector('girvin_newman', network_2022_extra,edge_selector_optimizer)
     print('Number of partition: ', dict_result_network_2022_extra['num_partitions'])
@@ -1,13 +1,95 @@
 import networkx as nx
+import numpy as np
+import graph_store
+import link_analysis
+import path_stats
+
+CENTRALITY_MEASURES = ('dc', 'cs', 'nbc', 'pr', 'auth')
+# Node-local measures, and the largest query for which they are computed per node
+# (one BFS each for closeness) instead of over the whole graph.
+LOCAL_MEASURES = ('dc', 'cs')
+TARGETED_MAX_NODES = 32
+
+# graph -> (fingerprint, {(measure, iterations): {node: value}}); entries go away with their graph
+_centrality_cache = graph_store.GraphCache(edge_attr='weight')
+
+
+def _compute_measure(network, measure, iterations):
+    if measure == 'dc':
+        return nx.degree_centrality(network)
+    if measure == 'cs':
+        return nx.closeness_centrality(network)
+    if measure == 'nbc':
+        return nx.betweenness_centrality(network, normalized=True)
+    if measure in ('pr', 'auth'):
+        if measure == 'pr':
+            result = link_analysis.pagerank(network, alpha=0.85, max_iter=iterations)
+        else:
+            result = link_analysis.hits(network, max_iter=iterations, method='svd')
+        if not result['converged']:
+            raise nx.PowerIterationFailedConvergence(iterations)
+        return result['scores'] if measure == 'pr' else result['authorities']
+    raise ValueError('Unknown centrality measure')
+
+
+def _full_measure(network, measure, iterations):
+    cached = _centrality_cache.entry(network)
+    key = (measure, iterations if measure in ('pr', 'auth') else None)
+    if key not in cached:
+        cached[key] = _compute_measure(network, measure, iterations)
+    return cached[key]
+
+
+def _targeted_measure(network, measure, nodes):
+    """
+    Degree or closeness centrality of the given nodes only, in O(n + m) per node,
+    reusing whole-graph or earlier per-node values when cached.
+    """
+    cached = _centrality_cache.entry(network)
+    if (measure, None) in cached:
+        return cached[measure, None]
+    values = cached.setdefault((measure, 'nodes'), {})
+    for node in nodes:
+        if node not in values:
+            if measure == 'dc':
+                n = network.number_of_nodes()
+                values[node] = network.degree(node) * (1.0 / (n - 1)) if n > 1 else 1
+            else:
+                values[node] = nx.closeness_centrality(network, u=node)
+    return values
+
+
+def clear_centrality_cache(network=None):
+    _centrality_cache.clear(network)
+
+
+def centrality_measures_batch(network, nodes=None, iterations=100, measures=CENTRALITY_MEASURES):
+    """
+    Every requested centrality measure for a list of nodes, computing each
+    whole-graph measure at most once per graph (until the graph changes).
+    Degree and closeness of at most TARGETED_MAX_NODES nodes are computed for
+    those nodes only.
+
+    :param: network: networkX object.
+            nodes: nodes to report, or None for all nodes.
+            measures: subset of CENTRALITY_MEASURES.
+    :return: {node: {measure: value}} for a list of nodes, or for nodes=None
+             {'nodes': node list, measure: numpy array aligned with it, ...}.
+    """
+    targeted = nodes is not None and len(nodes) <= TARGETED_MAX_NODES
+    values = {measure: _targeted_measure(network, measure, nodes) if targeted and measure in LOCAL_MEASURES
+              else _full_measure(network, measure, iterations) for measure in measures}
+    if nodes is None:
+        all_nodes = list(network.nodes())
+        table = {'nodes': all_nodes}
+        for measure, by_node in values.items():
+            table[measure] = np.array([by_node[node] for node in all_nodes])
+        return table
+    return {node: {measure: by_node[node] for measure, by_node in values.items()} for node in nodes}
+
 
 def centrality_measures(network, node, iterations=100):
-    dc = nx.degree_centrality(network)[node]
-    cs = nx.closeness_centrality(network)[node]
-    nbc = nx.betweenness_centrality(network, normalized=True)[node]
-    pr = nx.pagerank(network, alpha=0.85, max_iter=iterations)[node]
-    hits = nx.hits(network, max_iter=iterations)
-    auth = hits[1][node]
-    return {'dc': dc, 'cs': cs, 'nbc': nbc, 'pr': pr, 'auth': auth}
+    return centrality_measures_batch(network, [node], iterations)[node]
 
 
 def single_step_voucher(network):
@@ -22,41 +104,52 @@ def multiple_steps_voucher(network):
     return best_node
 
 
-def multiple_steps_diminished_voucher(network):
-    shortest_path_dict = dict(nx.shortest_path_length(network))
-    node_benefit_dict = {}
-    for node in network.nodes():
-        benefit = 0
-        for length in shortest_path_dict[node].values():
-            if length <= 4:
-                benefit += 1 - 0.025 * length
-        node_benefit_dict[node] = benefit
-    best_node = max(node_benefit_dict, key=node_benefit_dict.get)
-    return best_node
+def multiple_steps_diminished_voucher(network, histograms=None):
+    return generic_multiple_steps_diminished_voucher(network, r=0.025, max_steps=4, histograms=histograms)
 
 
-def find_most_valuable(network):
-    betweenness_centrality = nx.betweenness_centrality(network)
-    best_node = max(betweenness_centrality, key=betweenness_centrality.get)
+def find_most_valuable(network, confidence=0.95):
+    best_node = path_stats.top_k_betweenness(network, 1, confidence=confidence)['nodes'][0]
     return best_node
 
 
-def generic_multiple_steps_diminished_voucher(network, r=0.025, max_steps=4):
-    shortest_path_dict = dict(nx.shortest_path_length(network))
-    node_benefit_dict = {}
-    for node in network.nodes():
-        benefit = 0
-        for path_length in shortest_path_dict[node].values():
-            if path_length <= max_steps:
-                benefit += 1 - r * path_length
-        node_benefit_dict[node] = benefit
-    best_node = max(node_benefit_dict, key=node_benefit_dict.get)
+def voucher_benefits(histograms, r_values, max_steps_values):
+    """
+    Diminished voucher benefit of every node for a grid of (r, max_steps):
+    each node reached within max_steps at distance d adds 1 - r * d.
+
+    :param: histograms: array (n, k) of per-node distance counts, as returned by path_stats.distance_histograms
+                        with max_steps >= every value in max_steps_values.
+            r_values: decay rates.
+            max_steps_values: step limits.
+    :return: array (len(r_values), len(max_steps_values), n).
+    """
+    r_values = np.asarray(r_values, dtype=np.float64)
+    max_steps_values = np.asarray(max_steps_values)
+    if max_steps_values.max() >= histograms.shape[1]:
+        raise ValueError('histograms do not reach max_steps')
+    d = np.arange(histograms.shape[1])
+    weights = (1 - r_values[:, None, None] * d) * (d <= max_steps_values[:, None])
+    return np.einsum('rsd,nd->rsn', weights, histograms)
+
+
+def generic_multiple_steps_diminished_voucher(network, r=0.025, max_steps=4, histograms=None):
+    """
+    histograms may be a (node list, histogram array) pair from
+    path_stats.distance_histograms(network, k) with k >= max_steps, shared
+    across calls with different r and max_steps.
+    """
+    if histograms is None:
+        histograms = path_stats.distance_histograms(network, max_steps)
+    nodes, counts = histograms
+    benefits = voucher_benefits(counts, [r], [max_steps])[0, 0]
+    best_node = nodes[int(np.argmax(benefits))]
     return best_node
 
 
 if __name__ == "__main__":
 
-    friendships_network = nx.read_gml('friendships.gml')
+    friendships_network = graph_store.load_graph('friendships.gml', as_networkx=True)
 
     node_1_centrality = centrality_measures(friendships_network, 1)
     node_50_centrality = centrality_measures(friendships_network, 50)
@@ -83,15 +176,18 @@ if __name__ == "__main__":
     print(f'Most valuable node for marketing strategy using ‘find_most_valuable’: {best_candidate_valuable}')
     print('\n')
 
-    best_candidate_generic1 = generic_multiple_steps_diminished_voucher(friendships_network, r=0.025, max_steps=2)
+    # one depth-bounded BFS pass serves every (r, max_steps) pair below
+    friendships_histograms = path_stats.distance_histograms(friendships_network, 10)
+
+    best_candidate_generic1 = generic_multiple_steps_diminished_voucher(friendships_network, r=0.025, max_steps=2, histograms=friendships_histograms)
     print(f'Best candidate for sending the voucher using ‘generic_multiple_steps_diminished_voucher’ with r=0.025, max_steps=2: {best_candidate_generic1}')
     print('\n')
 
-    best_candidate_generic2 = generic_multiple_steps_diminished_voucher(friendships_network, r=0.01, max_steps=2)
+    best_candidate_generic2 = generic_multiple_steps_diminished_voucher(friendships_network, r=0.01, max_steps=2, histograms=friendships_histograms)
     print(f'Best candidate for sending the voucher using ‘generic_multiple_steps_diminished_voucher’ with r=0.01, max_steps=2: {best_candidate_generic2}')
     print('\n')
 
-    best_candidate_generic3 = generic_multiple_steps_diminished_voucher(friendships_network, r=0.01, max_steps=10)
+    best_candidate_generic3 = generic_multiple_steps_diminished_voucher(friendships_network, r=0.01, max_steps=10, histograms=friendships_histograms)
     print(f'Best candidate for sending the voucher using ‘generic_multiple_steps_diminished_voucher’ with r=0.01, max_steps=10: {best_candidate_generic3}')
     print('\n')
 
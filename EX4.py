@@ -1,8 +1,143 @@
-import networkx as nx
+import numpy as np
 import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from scipy.sparse import csr_array
+from scipy.stats import t as student_t
+import graph_store
+import path_stats
 
-def epidemic_analysis(network, model_type='SIS', infection_time=2, p=0.05, epochs=20, seed=209505593):
-    random.seed(seed)
+EPIDEMIC_ENGINES = ('loop', 'event')
+
+
+def status_index(network, overlay=None):
+    """
+    Nodes of each status, built in one pass so that event-driven runs on the
+    same graph and overlay can start from the infected nodes only.
+
+    :param: network: networkX object with a 'status' node attribute.
+            overlay: dict node -> status used instead of the graph's status attribute.
+    :return: dict 'S', 'I', 'R' -> list of nodes, where 'R' holds every status other than S and I.
+    """
+    overlay = {} if overlay is None else overlay
+    index = {'S': [], 'I': [], 'R': []}
+    for node, node_status in network.nodes(data='status'):
+        node_status = overlay.get(node, node_status).upper()
+        index[node_status if node_status in ('S', 'I') else 'R'].append(node)
+    return index
+
+
+def epidemic_time_series(network, model_type='SIS', infection_time=2, p=0.05, epochs=20, seed=209505593, overlay=None,
+                         index=None):
+    """
+    Event-driven epidemic_analysis: every epoch only touches the infected nodes
+    and their neighbours, statuses are read from the graph when first needed,
+    and r_0 is computed once, after the last epoch, from the infected nodes.
+    Given a status_index the setup only walks the infected nodes, so the cost
+    follows the outbreak instead of the graph size. Draws follow
+    epidemic_analysis order, so a seed gives the same outbreak.
+
+    :param: network: networkX object with 'status' and 'mortalitylikelihood' node attributes.
+            overlay: dict node -> status used instead of the graph's status attribute.
+            index: status_index(network, overlay), reusable across runs; built here when None.
+    :return: generator of dicts, one for the initial state (epoch 0) and one after every epoch, with
+             'epoch', 'S', 'I', 'R' counts, 'infections_total', 'infectious_current' and 'mortality_total';
+             the last one also holds 'r_0'.
+    """
+    rng = random.Random(seed)
+    overlay = {} if overlay is None else overlay
+    index = status_index(network, overlay) if index is None else index
+    nodes = network.nodes
+    statuses = {}
+
+    def status(node):
+        try:
+            return statuses[node]
+        except KeyError:
+            node_status = overlay.get(node, nodes[node]['status']).upper()
+            statuses[node] = node_status = node_status if node_status in ('S', 'I') else 'R'
+            return node_status
+
+    def set_status(node, new_status):
+        counts[status(node)] -= 1
+        counts[new_status] += 1
+        statuses[node] = new_status
+
+    counts = {node_status: len(index[node_status]) for node_status in ('S', 'I', 'R')}
+    infected_nodes_time = dict.fromkeys(index['I'], infection_time)
+    statuses.update(dict.fromkeys(infected_nodes_time, 'I'))
+    infections_total = infectious_current = counts['I']
+    mortality_total = 0
+
+    def state(epoch):
+        return {'epoch': epoch, 'S': counts['S'], 'I': counts['I'], 'R': counts['R'],
+                'infections_total': infections_total, 'infectious_current': infectious_current,
+                'mortality_total': mortality_total}
+
+    for epoch in range(epochs):
+        yield state(epoch)
+        infected_nodes = list(infected_nodes_time.keys())
+        for node in infected_nodes:
+            if infected_nodes_time[node] > 0:
+                infected_nodes_time[node] -= 1
+                for neighbor in network.neighbors(node):
+                    if status(neighbor) == 'S':
+                        for i in range(network.edges[node, neighbor].get('contacts', 1)):
+                            if rng.random() < p:
+                                set_status(neighbor, 'I')
+                                infections_total += 1
+                                infectious_current += 1
+                                infected_nodes_time[neighbor] = infection_time
+                                break
+                if rng.random() < nodes[node]['mortalitylikelihood']:
+                    mortality_total += 1
+                    infectious_current -= 1
+                    set_status(node, 'R')
+                    del infected_nodes_time[node]
+            else:
+                infectious_current -= 1
+                del infected_nodes_time[node]
+                if model_type == 'SIR':
+                    set_status(node, 'R')
+                else:
+                    if rng.random() < nodes[node]['mortalitylikelihood']:
+                        mortality_total += 1
+                        set_status(node, 'R')
+                    else:
+                        set_status(node, 'S')
+    yield dict(state(epochs), r_0=_r_0(network, infected_nodes_time, status, p, infectious_current))
+
+
+def _r_0(network, infected_nodes, status, p, infectious_current):
+    # expected infections the infected nodes cause over their susceptible neighbours
+    r_0 = 0
+    for node in infected_nodes:
+        for neighbor in network.neighbors(node):
+            if status(neighbor) == 'S':
+                r_0 += 1 - (1 - p) ** network.edges[node, neighbor].get('contacts', 1)
+    return r_0 / infectious_current if infectious_current > 0 else 0
+
+
+def epidemic_analysis(network, model_type='SIS', infection_time=2, p=0.05, epochs=20, seed=209505593, overlay=None,
+                      engine='loop', index=None):
+    """
+    :param: overlay: dict node -> status used instead of the graph's status attribute.
+            engine: 'loop' walks every node to set up and to compute r_0; 'event' runs
+                    epidemic_time_series, which pays off for a few infected nodes in a large graph.
+            index: status_index of the graph and overlay for the 'event' engine.
+    """
+    if engine not in EPIDEMIC_ENGINES:
+        raise ValueError("Invalid epidemic engine")
+    if engine == 'event':
+        for state in epidemic_time_series(network, model_type=model_type, infection_time=infection_time, p=p,
+                                          epochs=epochs, seed=seed, overlay=overlay, index=index):
+            pass
+        return {'infections_total': state['infections_total'],
+                'infectious_current': state['infectious_current'],
+                'mortality_total': state['mortality_total'],
+                'r_0': state['r_0']}
+
+    rng = random.Random(seed)
+    overlay = {} if overlay is None else overlay
 
     infections_total = 0
     infectious_current = 0
@@ -11,8 +146,8 @@ def epidemic_analysis(network, model_type='SIS', infection_time=2, p=0.05, epoch
     nodes_status = {}
     infected_nodes_time = {}
 
-    for node in network.nodes:
-        nodes_status[node] = network.nodes[node]['status'].upper()
+    for node, node_status in network.nodes(data='status'):
+        nodes_status[node] = overlay.get(node, node_status).upper()
         if nodes_status[node] == 'I':
             infected_nodes_time[node] = infection_time
             infections_total += 1
@@ -26,13 +161,13 @@ def epidemic_analysis(network, model_type='SIS', infection_time=2, p=0.05, epoch
                 for neighbor in network.neighbors(node):
                     if nodes_status[neighbor] == 'S':
                         for i in range(network.edges[node, neighbor].get('contacts', 1)):
-                            if random.random() < p:
+                            if rng.random() < p:
                                 nodes_status[neighbor] = 'I'
                                 infections_total += 1
                                 infectious_current += 1
                                 infected_nodes_time[neighbor] = infection_time
                                 break
-                if random.random() < network.nodes[node]['mortalitylikelihood']:
+                if rng.random() < network.nodes[node]['mortalitylikelihood']:
                     mortality_total += 1
                     infectious_current -= 1
                     nodes_status[node] = 'R'
@@ -43,14 +178,14 @@ def epidemic_analysis(network, model_type='SIS', infection_time=2, p=0.05, epoch
                 if model_type == 'SIR':
                     nodes_status[node] = 'R'
                 else:
-                    if random.random() < network.nodes[node]['mortalitylikelihood']:
+                    if rng.random() < network.nodes[node]['mortalitylikelihood']:
                         mortality_total += 1
                         nodes_status[node] = 'R'
                     else:
                         nodes_status[node] = 'S'
     r_0 = 0
     for node, status in nodes_status.items():
-        if nodes_status[node] == 'I':
+        if status == 'I':
             for neighbor in network.neighbors(node):
                 if nodes_status[neighbor] == 'S':
                     contacts = network.edges[node, neighbor].get('contacts', 1)
@@ -64,81 +199,314 @@ def epidemic_analysis(network, model_type='SIS', infection_time=2, p=0.05, epoch
             'r_0': r_0}
 
 
-def vaccination_analysis(network, model_type='SIR', infection_time=2, p=0.05, epochs=10, seed=209505593, vaccines=1, policy='rand'):
-    if policy == 'rand':
-        nodes_to_vaccinate = random.sample(list(network.nodes()), vaccines)
-    elif policy == 'betweenness':
-        betweenness_centrality = nx.betweenness_centrality(network)
-        nodes_to_vaccinate = sorted(betweenness_centrality, key=betweenness_centrality.get, reverse=True)[:vaccines]
-    elif policy == 'degree':
-        degrees = dict(network.degree())
-        nodes_to_vaccinate = sorted(degrees, key=degrees.get, reverse=True)[:vaccines]
-    elif policy == 'mortality':
-        mortalities = dict(network.nodes(data='mortalitylikelihood'))
-        nodes_to_vaccinate = sorted(mortalities, key=mortalities.get, reverse=True)[:vaccines]
+def _epidemic_arrays(network, p, overlay=None):
+    """
+    CSR adjacency, per-edge transmission probability 1 - (1 - p) ** contacts,
+    initial statuses (0 = S, 1 = I, 2 = anything else) and mortality likelihoods.
+    """
+    graph = network if isinstance(network, graph_store.CSRGraph) else graph_store.csr_from_networkx(network)
+    n = graph.number_of_nodes()
+    if 'contacts' in graph.edge_attrs:
+        contacts, mask = graph.edge_attrs['contacts']
+        contacts = np.where(mask, contacts, 1) if mask is not None else np.asarray(contacts)
     else:
+        contacts = np.ones(len(graph.indices))
+    transmission = 1 - (1 - p) ** np.asarray(contacts, dtype=np.float64)
+    statuses = np.asarray(graph.node_attrs['status'][0], dtype=object)
+    if overlay:
+        statuses = statuses.copy()
+        index = graph.node_index()
+        for node, status in overlay.items():
+            statuses[index[node]] = status
+    statuses = np.char.upper(statuses.astype(str))
+    status = np.full(n, 2, dtype=np.int8)
+    status[statuses == 'S'] = 0
+    status[statuses == 'I'] = 1
+    mortality = np.asarray(graph.node_attrs['mortalitylikelihood'][0], dtype=np.float64)
+    Q = csr_array((transmission, graph.indices, graph.indptr), shape=(n, n))
+    return graph, Q, status, mortality
+
+
+def epidemic_analysis_replicates(network, model_type='SIS', infection_time=2, p=0.05, epochs=20, replicates=100,
+                                 seed=209505593, overlay=None):
+    """
+    Array-backed version of epidemic_analysis running many replicates at once
+    as a (replicates x nodes) state matrix. Each edge's contacts collapse into
+    one transmission probability, so a susceptible node is infected in an epoch
+    with probability 1 - prod(1 - q) over its infectious neighbours, which is
+    the distribution of the per-contact draws of epidemic_analysis. As there,
+    nodes whose infection ends are handled before the infectious ones transmit,
+    so in SIS a recovered node can be reinfected in the same epoch.
+
+    :param: network: networkX object or graph_store.CSRGraph with 'status' and
+                     'mortalitylikelihood' node attributes and optional 'contacts' edge attributes.
+            replicates: number of independent runs.
+            seed: seed of the numpy Generator driving all replicates.
+            overlay: dict node -> status used instead of the graph's status attribute.
+    :return: dict of arrays with one entry per replicate: 'infections_total',
+             'infectious_current', 'mortality_total' and 'r_0'.
+    """
+    rng = np.random.default_rng(seed)
+    graph, Q, initial, mortality = _epidemic_arrays(network, p, overlay)
+    n = len(initial)
+    # log escape probability per edge; a certain transmission becomes a very unlikely escape
+    log_escape = csr_array((np.log1p(-np.minimum(Q.data, 1 - 1e-16)), Q.indices, Q.indptr), shape=(n, n))
+
+    status = np.repeat(initial[None, :], replicates, axis=0)
+    timer = np.where(status == 1, infection_time, 0)
+    infections_total = np.count_nonzero(status == 1, axis=1)
+    infectious_current = infections_total.copy()
+    mortality_total = np.zeros(replicates, dtype=np.int64)
+
+    for epoch in range(epochs):
+        infected = status == 1
+        expiring = infected & (timer == 0)
+        active = infected & (timer > 0)
+        infectious_current -= np.count_nonzero(expiring, axis=1)
+        if model_type == 'SIR':
+            status[expiring] = 2
+        else:
+            dies = expiring & (rng.random((replicates, n)) < mortality)
+            mortality_total += np.count_nonzero(dies, axis=1)
+            status[dies] = 2
+            status[expiring & ~dies] = 0
+
+        escape = np.exp((log_escape.T @ active.T.astype(np.float64)).T)
+        infect = (status == 0) & (rng.random((replicates, n)) >= escape)
+
+        timer[active] -= 1
+        dies = active & (rng.random((replicates, n)) < mortality)
+        mortality_total += np.count_nonzero(dies, axis=1)
+        infectious_current -= np.count_nonzero(dies, axis=1)
+        status[dies] = 2
+
+        status[infect] = 1
+        timer[infect] = infection_time
+        new_infections = np.count_nonzero(infect, axis=1)
+        infections_total += new_infections
+        infectious_current += new_infections
+
+    # expected infections caused by the currently infectious nodes, over their susceptible neighbours
+    pressure = (Q.T @ (status == 1).T.astype(np.float64)).T
+    r_0 = (pressure * (status == 0)).sum(axis=1)
+    r_0 = np.divide(r_0, infectious_current, out=np.zeros(replicates), where=infectious_current > 0)
+    return {'infections_total': infections_total,
+            'infectious_current': infectious_current,
+            'mortality_total': mortality_total,
+            'r_0': r_0}
+
+
+VACCINATION_POLICIES = ('rand', 'betweenness', 'degree', 'mortality')
+
+_ranking_cache = graph_store.GraphCache(node_attr='mortalitylikelihood')
+
+
+def clear_ranking_cache(network=None):
+    _ranking_cache.clear(network)
+
+
+def policy_ranking(network, policy, count, seed=209505593):
+    """
+    The first count nodes to vaccinate under a policy. Full rankings are
+    computed once per graph (until the graph changes) and every count takes a
+    prefix; betweenness of graphs above path_stats.EXACT_MAX_NODES is only
+    estimated for the top count nodes, so a longer prefix reruns it. The rand
+    policy is a seeded shuffle, so its prefixes are nested too.
+
+    :param: network: networkX object.
+            policy: one of VACCINATION_POLICIES.
+            count: number of nodes.
+            seed: seed of the rand policy.
+    :return: list of nodes.
+    """
+    if policy not in VACCINATION_POLICIES:
         raise ValueError("Invalid vaccination policy")
+    if policy == 'rand':
+        nodes = list(network.nodes())
+        random.Random(seed).shuffle(nodes)
+        return nodes[:count]
+
+    rankings = _ranking_cache.entry(network)
+    n = network.number_of_nodes()
+    if policy == 'betweenness':
+        if len(rankings.get(policy, ())) < min(count, n):
+            k = n if n <= path_stats.EXACT_MAX_NODES else count
+            rankings[policy] = path_stats.top_k_betweenness(network, k)['nodes']
+    elif policy not in rankings:
+        if policy == 'degree':
+            scores = dict(network.degree())
+        else:
+            scores = dict(network.nodes(data='mortalitylikelihood'))
+        rankings[policy] = sorted(scores, key=scores.get, reverse=True)
+    return rankings[policy][:count]
+
+
+def vaccination_analysis(network, model_type='SIR', infection_time=2, p=0.05, epochs=10, seed=209505593, vaccines=1, policy='rand'):
+    vaccinated = policy_ranking(network, policy, vaccines, seed=seed)
+    overlay = dict.fromkeys(vaccinated, 'R')
+    return epidemic_analysis(network=network, model_type=model_type, infection_time=infection_time, p=p, epochs=epochs,
+                             seed=seed, overlay=overlay)
+
+
+EPIDEMIC_METRICS = ('infections_total', 'infectious_current', 'mortality_total', 'r_0')
+
+_ensemble_worker = None
+
+
+def _ensemble_network(network, rankings=None):
+    # the networkX graph the replicates run on, with the precomputed rankings cached for it
+    if isinstance(network, graph_store.CSRGraph):
+        network = network.to_networkx()
+    if rankings:
+        _ranking_cache.entry(network).update(rankings)
+    return network
+
+
+def _init_ensemble_worker(network, analysis, rankings=None):
+    global _ensemble_worker
+    _ensemble_worker = (_ensemble_network(network, rankings), analysis)
+
+
+def _run_replicate(setting, seed):
+    network, analysis = _ensemble_worker
+    return analysis(network, **setting, seed=seed)
+
+
+class _RunningStats:
+    """Welford mean and variance of every metric, with a Student t confidence interval."""
+
+    def __init__(self, confidence):
+        self.confidence = confidence
+        self.count = 0
+        self.mean = dict.fromkeys(EPIDEMIC_METRICS, 0.0)
+        self.m2 = dict.fromkeys(EPIDEMIC_METRICS, 0.0)
+
+    def add(self, result):
+        self.count += 1
+        for metric in EPIDEMIC_METRICS:
+            delta = result[metric] - self.mean[metric]
+            self.mean[metric] += delta / self.count
+            self.m2[metric] += delta * (result[metric] - self.mean[metric])
+
+    def summary(self):
+        summary = {}
+        for metric in EPIDEMIC_METRICS:
+            mean = self.mean[metric]
+            variance = self.m2[metric] / (self.count - 1) if self.count > 1 else float('nan')
+            if self.count > 1:
+                half = float(student_t.ppf((1 + self.confidence) / 2, self.count - 1) * np.sqrt(variance / self.count))
+            else:
+                half = float('inf')
+            summary[metric] = {'mean': mean, 'variance': variance, 'ci': (mean - half, mean + half)}
+        return summary
+
+    def width(self):
+        return max(ci[1] - ci[0] for ci in (stats['ci'] for stats in self.summary().values()))
+
+
+def run_ensemble(network, settings, analysis=None, replicates=10, ci_width=None, min_replicates=10,
+                 confidence=0.95, workers=1, seed=209505593, rankings=None):
+    """
+    Monte Carlo ensemble of an epidemic analysis over several settings.
+    Every replicate gets its own stream spawned from np.random.SeedSequence(seed),
+    results are aggregated as they arrive and a setting stops once the
+    confidence interval of every metric is narrower than ci_width.
+
+    :param: network: networkX object, or a graph_store.CSRGraph opened from the store, which
+                     worker processes map again instead of receiving a pickled copy of the graph.
+            settings: list of keyword dicts for the analysis (without seed).
+            analysis: epidemic_analysis (default), vaccination_analysis or another
+                      function of (network, **setting, seed) returning the epidemic metrics.
+            replicates: maximal number of replicates per setting (the exact number without ci_width).
+            ci_width: stop a setting once every metric's interval is narrower than this.
+            min_replicates: replicates to run before checking ci_width.
+            confidence: confidence level of the intervals.
+            workers: processes to run the replicates on.
+            rankings: dict policy -> ranking from policy_ranking, handed to every worker so that
+                      vaccination_analysis does not rank the graph again in each process.
+    :return: list with one dict per setting: 'setting', 'replicates', 'converged'
+             and 'metrics' (metric -> {'mean', 'variance', 'ci'}).
+    """
+    analysis = epidemic_analysis if analysis is None else analysis
+    streams = np.random.SeedSequence(seed).spawn(len(settings))
+    stats = [_RunningStats(confidence) for _ in settings]
+    submitted = [0] * len(settings)
+
+    def converged(i):
+        return ci_width is not None and stats[i].count >= max(min_replicates, 2) and stats[i].width() < ci_width
+
+    def next_task():
+        # the unfinished setting with the fewest submitted replicates
+        open_settings = [i for i in range(len(settings)) if submitted[i] < replicates and not converged(i)]
+        if not open_settings:
+            return None
+        i = min(open_settings, key=submitted.__getitem__)
+        submitted[i] += 1
+        return i, int(streams[i].spawn(1)[0].generate_state(1)[0])
+
+    if workers <= 1:
+        network = _ensemble_network(network, rankings)
+        task = next_task()
+        while task is not None:
+            i, replicate_seed = task
+            stats[i].add(analysis(network, **settings[i], seed=replicate_seed))
+            task = next_task()
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_ensemble_worker, initargs=(network, analysis, rankings)) as executor:
+            pending = {}
+            while True:
+                while len(pending) < 2 * workers:
+                    task = next_task()
+                    if task is None:
+                        break
+                    pending[executor.submit(_run_replicate, settings[task[0]], task[1])] = task[0]
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stats[pending.pop(future)].add(future.result())
+
+    return [{'setting': setting, 'replicates': stats[i].count, 'converged': bool(converged(i)),
+             'metrics': stats[i].summary()} for i, setting in enumerate(settings)]
+
+
+def vaccination_sweep(network, vaccine_counts, policies=VACCINATION_POLICIES, setting=None, replicates=10,
+                      ci_width=None, workers=1, seed=209505593):
+    """
+    vaccination_analysis ensembles for every policy and vaccine count. The graph
+    is never modified and each policy's ranking is computed once, here, and
+    handed to the workers; every count takes a prefix of it.
+
+    :param: network: networkX object or graph_store.CSRGraph, as in run_ensemble.
+            vaccine_counts: numbers of vaccines to try.
+            policies: subset of VACCINATION_POLICIES.
+            setting: epidemic keywords (model_type, infection_time, p, epochs).
+            replicates, ci_width, workers, seed: as in run_ensemble.
+    :return: dict (policy, vaccines) -> run_ensemble result.
+    """
+    setting = {} if setting is None else setting
+    counts = sorted(set(vaccine_counts), reverse=True)
+    ranked = [policy for policy in policies if policy != 'rand']
+    graph = network.to_networkx() if isinstance(network, graph_store.CSRGraph) else network
+    for policy in ranked:
+        policy_ranking(graph, policy, counts[0])
+    # the cached rankings are full wherever they can be, not just the first counts[0] nodes
+    cached = _ranking_cache.entry(graph)
+    rankings = {policy: cached[policy] for policy in ranked}
+    settings = [dict(setting, vaccines=count, policy=policy) for policy in policies for count in counts]
+    results = run_ensemble(network, settings, analysis=vaccination_analysis, replicates=replicates,
+                           ci_width=ci_width, workers=workers, seed=seed, rankings=rankings)
+    return {(result['setting']['policy'], result['setting']['vaccines']): result for result in results}
 
-    for node in nodes_to_vaccinate:
-        network.nodes[node]['status'] = 'R'
-    return epidemic_analysis(network=network, model_type=model_type, infection_time=infection_time, p=p, epochs=epochs, seed=seed)
 
 if __name__ == "__main__":
-    network1 = nx.read_gml('epidemic1.gml')
-    network2 = nx.read_gml('epidemic2.gml')
+    network1 = graph_store.load_graph('epidemic1.gml', as_networkx=True)
+    network2 = graph_store.load_graph('epidemic2.gml', as_networkx=True)
     networks = [network1, network2]
 
     num_simulations_part1 = 10
     num_simulations_part2 = 20
 
-
-    def simulations_part1(networkk, setting, num_simulations=10, seed=209505593):
-        total_infections = 0
-        total_infectious_current = 0
-        total_mortality = 0
-        total_r0 = 0
-        for _ in range(num_simulations):
-            seed += 1
-            simulation_result = epidemic_analysis(networkk, **setting, seed=seed)
-            total_infections += simulation_result['infections_total']
-            total_infectious_current += simulation_result['infectious_current']
-            total_mortality += simulation_result['mortality_total']
-            total_r0 += simulation_result['r_0']
-
-        average_infections = total_infections / num_simulations
-        average_infectious_current = total_infectious_current / num_simulations
-        average_mortality = total_mortality / num_simulations
-        average_r0 = total_r0 / num_simulations
-
-        return {'Average_infections': average_infections,
-                'Average_infectious_current': average_infectious_current,
-                'Average_mortality': average_mortality,
-                'Average_r0': average_r0}
-
-
-    def simulations_part2(networkk, setting, num_simulations=10, seed=209505593):
-        total_infections = 0
-        total_infectious_current = 0
-        total_mortality = 0
-        total_r0 = 0
-        for _ in range(num_simulations):
-            simulation_result = vaccination_analysis(networkk, **setting, seed=seed)
-            seed += 1
-            total_infections += simulation_result['infections_total']
-            total_infectious_current += simulation_result['infectious_current']
-            total_mortality += simulation_result['mortality_total']
-            total_r0 += simulation_result['r_0']
-
-        average_infections = total_infections / num_simulations
-        average_infectious_current = total_infectious_current / num_simulations
-        average_mortality = total_mortality / num_simulations
-        average_r0 = total_r0 / num_simulations
-
-        return {'Average_infections': average_infections,
-                'Average_infectious_current': average_infectious_current,
-                'Average_mortality': average_mortality,
-                'Average_r0': average_r0}
-
     print("Part 1", "\n")
 
     settings_part1 = [{'model_type': 'SIS', 'infection_time': 2, 'p': 0.05, 'epochs': 20},
@@ -148,11 +516,10 @@ if __name__ == "__main__":
 
     for network in networks:
         print('Network:', network, "\n")
-        for setting in settings_part1:
-            print('Setting', setting)
-            result = simulations_part1(network, setting, num_simulations=num_simulations_part1)
-            print(f'The average results after {num_simulations_part1} simulations:')
-            print(result, "\n")
+        for result in run_ensemble(network, settings_part1, replicates=num_simulations_part1):
+            print('Setting', result['setting'])
+            print(f'The average results after {result["replicates"]} simulations:')
+            print({metric: stats['mean'] for metric, stats in result['metrics'].items()}, "\n")
 
     print("Part 2", "\n")
 
@@ -163,9 +530,8 @@ if __name__ == "__main__":
 
     for network in networks:
         print('Network:', network, "\n")
-        for setting in settings_part2:
-            print('Setting', setting)
-            result = simulations_part2(network, setting, num_simulations=num_simulations_part2)
-            print(f'The average results after {num_simulations_part2} simulations:')
-            print(result, "\n")
+        for result in run_ensemble(network, settings_part2, analysis=vaccination_analysis, replicates=num_simulations_part2):
+            print('Setting', result['setting'])
+            print(f'The average results after {result["replicates"]} simulations:')
+            print({metric: stats['mean'] for metric, stats in result['metrics'].items()}, "\n")
 
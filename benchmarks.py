@@ -0,0 +1,273 @@
+"""
+Benchmarks of EX1-EX4 on synthetic inputs generated offline, across size tiers.
+
+    python benchmarks.py                      # small tier, compared with the stored baseline
+    python benchmarks.py --tiers small medium large --only voucher
+    python benchmarks.py --tiers small medium --save-baseline
+    python benchmarks.py --baseline my_baseline.json --tolerance 1.5
+
+Every benchmark reports its best wall time over --repeat runs and the peak
+memory allocated by one extra run under tracemalloc, and prints the scaling
+exponent between consecutive tiers (slope of log time over log size). The exit
+status is 1 when a time or peak memory exceeds the baseline by more than the
+tolerance factor, and 2 when the baseline file or an entry for a benchmark
+and tier that ran is missing.
+
+Timings are machine-specific: the committed benchmarks_baseline.json holds the
+small tier as measured on one development machine, so on other hardware store
+a local baseline first (--save-baseline, optionally to another --baseline path)
+and compare against that.
+"""
+import argparse
+import atexit
+import csv
+import gzip
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import networkx as nx
+import EX1
+import EX2
+import EX3
+import EX4
+
+TIERS = ('small', 'medium', 'large')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks_baseline.json')
+# differences below these are too noisy to flag
+NOISE_SECONDS = 0.05
+NOISE_BYTES = 1 << 20
+SEED = 209505593
+
+
+def gnp_graph(n, average_degree=6, seed=SEED):
+    return nx.fast_gnp_random_graph(n, average_degree / (n - 1), seed=seed)
+
+
+def scale_free_graph(n, m=3, seed=SEED):
+    return nx.powerlaw_cluster_graph(n, m, 0.3, seed=seed)
+
+
+def epidemic_graph(n, infected=0.01, seed=SEED):
+    rng = random.Random(seed)
+    G = scale_free_graph(n, seed=seed)
+    for node in G:
+        G.nodes[node]['status'] = 'I' if rng.random() < infected else 'S'
+        G.nodes[node]['mortalitylikelihood'] = rng.random() * 0.05
+    for u, v in G.edges:
+        G.edges[u, v]['contacts'] = rng.randint(1, 5)
+    return G
+
+
+def tweet_dumps(directory, days, tweets_per_day, players=200, users=2000, retweet_share=0.6, seed=SEED):
+    """
+    Daily Hebrew_tweets.json.YYYY-MM-DD.0.gz dumps and the 2019 central players
+    file in directory. Half of the retweeted users are central players.
+    """
+    rng = random.Random(seed)
+    player_ids = [str(10 ** 6 + i) for i in range(players)]
+    user_ids = player_ids + [str(2 * 10 ** 6 + i) for i in range(users)]
+    with open(os.path.join(directory, 'central_political_players_2019.csv'), 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['id', 'name'])
+        for player in player_ids:
+            writer.writerow([player, 'player ' + player])
+    for day in range(days):
+        date = '2019-03-%02d' % (day + 1)
+        with gzip.open(os.path.join(directory, 'Hebrew_tweets.json.%s.0.gz' % date), 'wt') as file:
+            for i in range(tweets_per_day):
+                tweet = {'id_str': '%s-%d' % (date, i), 'text': 'tweet', 'user': {'id_str': rng.choice(user_ids)}}
+                if rng.random() < retweet_share:
+                    original = rng.choice(player_ids) if rng.random() < 0.5 else rng.choice(user_ids)
+                    tweet['retweeted_status'] = {'id_str': str(i), 'user': {'id_str': original}}
+                file.write(json.dumps(tweet) + '\n')
+    return '2019-03-01', '2019-03-%02d' % days
+
+
+def _networks_avg_stats(tier):
+    n = {'small': 100, 'medium': 400, 'large': 1600}[tier]
+    # path statistics need connected graphs: keep the giant component
+    networks = [gnp_graph(n, seed=SEED + i) for i in range(5)]
+    networks = [G.subgraph(max(nx.connected_components(G), key=len)).copy() for G in networks]
+    return n, lambda: EX1.networks_avg_stats(networks)
+
+
+def _community_detector(algorithm_name, sizes):
+    def setup(tier):
+        n = sizes[tier]
+        network = scale_free_graph(n)
+        return n, lambda: EX2.community_detector(algorithm_name, network)
+    return setup
+
+
+def _construct_heb_edges(tier):
+    tweets_per_day = {'small': 1000, 'medium': 5000, 'large': 25000}[tier]
+    directory = tempfile.mkdtemp(prefix='heb_tweets_')
+    atexit.register(shutil.rmtree, directory, True)
+    start_date, end_date = tweet_dumps(directory, 7, tweets_per_day)
+    return 7 * tweets_per_day, lambda: EX2.construct_heb_edges(directory, start_date, end_date, non_parliamentarians_nodes=50)
+
+
+def _centrality_measures(tier):
+    n = {'small': 200, 'medium': 1000, 'large': 4000}[tier]
+    network = scale_free_graph(n)
+
+    def run():
+        EX3.clear_centrality_cache(network)
+        return EX3.centrality_measures(network, 1)
+    return n, run
+
+
+def _voucher(function):
+    def setup(tier):
+        n = {'small': 200, 'medium': 1000, 'large': 4000}[tier]
+        network = scale_free_graph(n)
+        return n, lambda: function(network)
+    return setup
+
+
+def _epidemic_analysis(tier):
+    n = {'small': 1000, 'medium': 10000, 'large': 100000}[tier]
+    network = epidemic_graph(n)
+    return n, lambda: EX4.epidemic_analysis(network, model_type='SIS', infection_time=3, p=0.1, epochs=30)
+
+
+BENCHMARKS = {
+    'networks_avg_stats': _networks_avg_stats,
+    'community_detector.girvin_newman': _community_detector('girvin_newman', {'small': 40, 'medium': 80, 'large': 160}),
+    'community_detector.louvain': _community_detector('louvain', {'small': 500, 'medium': 2000, 'large': 8000}),
+    'community_detector.clique_percolation': _community_detector('clique_percolation', {'small': 200, 'medium': 800, 'large': 3200}),
+    'construct_heb_edges': _construct_heb_edges,
+    'centrality_measures': _centrality_measures,
+    'single_step_voucher': _voucher(EX3.single_step_voucher),
+    'multiple_steps_voucher': _voucher(EX3.multiple_steps_voucher),
+    'multiple_steps_diminished_voucher': _voucher(EX3.multiple_steps_diminished_voucher),
+    'find_most_valuable': _voucher(EX3.find_most_valuable),
+    'epidemic_analysis': _epidemic_analysis,
+}
+
+
+def measure(run, repeat=3):
+    """
+    :return: (best wall time in seconds over repeat runs, peak traced memory in bytes of one more run).
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(names, tiers, repeat=3, report=print):
+    """
+    :return: dict benchmark name -> tier -> {'size', 'seconds', 'peak_bytes'}.
+    """
+    results = {}
+    for name in names:
+        results[name] = {}
+        for tier in tiers:
+            size, run = BENCHMARKS[name](tier)
+            seconds, peak = measure(run, repeat)
+            results[name][tier] = {'size': size, 'seconds': seconds, 'peak_bytes': peak}
+            report('%-40s %-7s size %-8d %10.4fs %10.1f MiB' % (name, tier, size, seconds, peak / 2 ** 20))
+    return results
+
+
+def scaling_exponents(results):
+    """
+    :return: dict benchmark name -> list of (tier, next tier, exponent k of time ~ size^k).
+    """
+    exponents = {}
+    for name, by_tier in results.items():
+        tiers = [tier for tier in TIERS if tier in by_tier]
+        exponents[name] = []
+        for a, b in zip(tiers, tiers[1:]):
+            ta, tb = by_tier[a], by_tier[b]
+            if ta['seconds'] > 0 and tb['seconds'] > 0 and ta['size'] != tb['size']:
+                exponent = math.log(tb['seconds'] / ta['seconds']) / math.log(tb['size'] / ta['size'])
+                exponents[name].append((a, b, exponent))
+    return exponents
+
+
+def regressions(results, baseline, tolerance=1.5):
+    """
+    :return: list of messages, one per time or peak memory above tolerance times its baseline.
+    """
+    messages = []
+    for name, by_tier in results.items():
+        for tier, result in by_tier.items():
+            reference = baseline.get(name, {}).get(tier)
+            if reference is None:
+                continue
+            if result['seconds'] > max(reference['seconds'] * tolerance, reference['seconds'] + NOISE_SECONDS):
+                messages.append('%s [%s]: %.4fs vs baseline %.4fs' % (name, tier, result['seconds'], reference['seconds']))
+            if result['peak_bytes'] > max(reference['peak_bytes'] * tolerance, reference['peak_bytes'] + NOISE_BYTES):
+                messages.append('%s [%s]: peak %d bytes vs baseline %d bytes'
+                                % (name, tier, result['peak_bytes'], reference['peak_bytes']))
+    return messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of EX1-EX4 on synthetic inputs.')
+    parser.add_argument('--tiers', nargs='+', choices=TIERS, default=['small'])
+    parser.add_argument('--only', help='regular expression selecting benchmark names')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to --baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown / memory growth factor')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.only is None or re.search(args.only, name)]
+    results = run_benchmarks(names, args.tiers, args.repeat)
+
+    print('\nScaling exponents (time ~ size^k):')
+    for name, exponents in scaling_exponents(results).items():
+        if exponents:
+            print('%-40s %s' % (name, '  '.join('%s->%s %.2f' % exponent for exponent in exponents)))
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        for name, by_tier in results.items():
+            baseline.setdefault(name, {}).update(by_tier)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print('\nBaseline written to', args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print('\nNo baseline at %s; run with --save-baseline to store one.' % args.baseline)
+        return 2
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    missing = ['%s [%s]' % (name, tier) for name, by_tier in results.items() for tier in by_tier
+               if tier not in baseline.get(name, {})]
+    if missing:
+        print('\nNo baseline for: ' + ', '.join(missing))
+        return 2
+    messages = regressions(results, baseline, args.tolerance)
+    if messages:
+        print('\nRegressions:')
+        for message in messages:
+            print('  ' + message)
+        return 1
+    print('\nNo regressions against', args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
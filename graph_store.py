@@ -0,0 +1,436 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+
+import networkx as nx
+import numpy as np
+
+CACHE_DIR_NAME = '.graph_cache'
+FORMAT_VERSION = 1
+
+
+class CSRGraph:
+    """
+    Compact graph stored as a CSR adjacency plus node/edge attribute columns.
+
+    Node i is ``nodes[i]``; its neighbours (successors for directed graphs) are
+    ``indices[indptr[i]:indptr[i + 1]]``. Undirected edges are stored in both
+    directions, and every edge attribute column is aligned with ``indices``.
+    Arrays may be ``numpy.memmap`` views of the on-disk store entry at ``path``.
+    """
+
+    def __init__(self, nodes, indptr, indices, directed=False, node_attrs=None, edge_attrs=None, graph_attrs=None,
+                 path=None):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        self.directed = directed
+        self.node_attrs = node_attrs if node_attrs is not None else {}
+        self.edge_attrs = edge_attrs if edge_attrs is not None else {}
+        self.graph_attrs = graph_attrs if graph_attrs is not None else {}
+        self.path = path
+
+    def number_of_nodes(self):
+        return len(self.indptr) - 1
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        loops = int(np.count_nonzero(self.indices == np.repeat(np.arange(self.number_of_nodes()), np.diff(self.indptr))))
+        return (len(self.indices) + loops) // 2
+
+    def degree(self):
+        """
+        :return: numpy array with the (out-)degree of every node, in node order.
+        """
+        return np.diff(self.indptr)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def node_index(self):
+        """
+        :return: dict mapping every node label to its row in the CSR arrays.
+        """
+        return {node: i for i, node in enumerate(self.nodes.tolist())}
+
+    def to_networkx(self):
+        """
+        Rebuild the equivalent networkX object, attributes included.
+
+        :return: nx.Graph or nx.DiGraph.
+        """
+        G = nx.DiGraph() if self.directed else nx.Graph()
+        G.graph.update(self.graph_attrs)
+        labels = self.nodes.tolist()
+        node_columns = {name: _column_values(column) for name, column in self.node_attrs.items()}
+        if node_columns:
+            G.add_nodes_from((node, {name: values[i] for name, values in node_columns.items() if values[i] is not _MISSING})
+                             for i, node in enumerate(labels))
+        else:
+            G.add_nodes_from(labels)
+        sources = np.repeat(np.arange(self.number_of_nodes()), np.diff(self.indptr))
+        targets = np.asarray(self.indices)
+        # undirected edges are stored both ways: keep one copy of each
+        keep = slice(None) if self.directed else np.flatnonzero(sources <= targets)
+        heads = self.nodes[sources[keep]].tolist()
+        tails = self.nodes[targets[keep]].tolist()
+        edge_columns = {name: (values[keep], mask[keep] if mask is not None else None)
+                        for name, (values, mask) in self.edge_attrs.items()}
+        if edge_columns:
+            edge_columns = {name: _column_values(column) for name, column in edge_columns.items()}
+            G.add_edges_from((u, v, {name: values[k] for name, values in edge_columns.items() if values[k] is not _MISSING})
+                             for k, (u, v) in enumerate(zip(heads, tails)))
+        else:
+            G.add_edges_from(zip(heads, tails))
+        return G
+
+    def __getstate__(self):
+        if self.path is not None:
+            # a pickled store graph (e.g. sent to a worker process) maps the same files again
+            return {'path': self.path}
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if set(state) == {'path'}:
+            state = _load_csr(state['path']).__dict__
+        self.__dict__.update(state)
+
+
+_MISSING = object()
+
+
+def _column_values(column):
+    values, mask = column
+    values = values.tolist()
+    if mask is None:
+        return values
+    return [value if present else _MISSING for value, present in zip(values, mask.tolist())]
+
+
+def _to_column(values):
+    """
+    Pack a list of attribute values (None meaning "absent") into an array and
+    an optional presence mask. Returns None for values that don't fit a
+    fixed-width dtype, so they are left out of the store.
+    """
+    present = [value is not None for value in values]
+    sample = [value for value in values if value is not None]
+    if not sample:
+        return None
+    if all(isinstance(value, (bool, np.bool_)) for value in sample):
+        array = np.array([bool(value) if value is not None else False for value in values])
+    elif all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in sample):
+        array = np.array([value if value is not None else 0 for value in values], dtype=np.int64)
+    elif all(isinstance(value, (int, float, np.integer, np.floating)) for value in sample):
+        array = np.array([value if value is not None else np.nan for value in values], dtype=np.float64)
+    elif all(isinstance(value, str) for value in sample):
+        array = np.array([value if value is not None else '' for value in values], dtype=str)
+    else:
+        return None
+    mask = None if all(present) else np.array(present)
+    return array, mask
+
+
+def csr_from_networkx(G):
+    """
+    Convert a networkX graph into a CSRGraph.
+
+    :param: G: nx.Graph or nx.DiGraph (multigraphs are not supported).
+    :return: CSRGraph holding the adjacency and every node/edge attribute with a fixed-width type.
+    """
+    if G.is_multigraph():
+        raise ValueError('Multigraphs are not supported by the graph store')
+    labels = list(G.nodes())
+    nodes = np.array(labels)
+    if nodes.dtype.kind not in 'iuU' or nodes.ndim != 1:
+        raise ValueError('Node labels must all be integers or all be strings')
+    index = {node: i for i, node in enumerate(labels)}
+
+    indptr = np.zeros(len(labels) + 1, dtype=np.int64)
+    indices = []
+    edge_values = {}
+    k = 0
+    for i, node in enumerate(labels):
+        for neighbor, data in G.adj[node].items():
+            indices.append(index[neighbor])
+            for name, value in data.items():
+                edge_values.setdefault(name, {})[k] = value
+            k += 1
+        indptr[i + 1] = k
+
+    node_attrs = {}
+    names = {name for _, data in G.nodes(data=True) for name in data}
+    for name in sorted(names):
+        column = _to_column([G.nodes[node].get(name) for node in labels])
+        if column is not None:
+            node_attrs[name] = column
+    edge_attrs = {}
+    for name in sorted(edge_values):
+        column = _to_column([edge_values[name].get(j) for j in range(k)])
+        if column is not None:
+            edge_attrs[name] = column
+
+    graph_attrs = {}
+    for name, value in G.graph.items():
+        try:
+            json.dumps(value)
+        except TypeError:
+            continue
+        graph_attrs[name] = value
+    return CSRGraph(nodes, indptr, np.array(indices, dtype=np.int64), G.is_directed(), node_attrs, edge_attrs, graph_attrs)
+
+
+def _save_csr(graph, path):
+    os.makedirs(path)
+    np.save(os.path.join(path, 'nodes.npy'), graph.nodes)
+    np.save(os.path.join(path, 'indptr.npy'), graph.indptr)
+    np.save(os.path.join(path, 'indices.npy'), graph.indices)
+    meta = {'directed': graph.directed, 'graph': graph.graph_attrs, 'node_attrs': {}, 'edge_attrs': {}}
+    for kind, columns in (('node_attrs', graph.node_attrs), ('edge_attrs', graph.edge_attrs)):
+        for j, (name, (values, mask)) in enumerate(columns.items()):
+            prefix = '%s_%d' % (kind.split('_')[0], j)
+            np.save(os.path.join(path, prefix + '.npy'), values)
+            if mask is not None:
+                np.save(os.path.join(path, prefix + '_mask.npy'), mask)
+            meta[kind][name] = {'file': prefix, 'masked': mask is not None}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def _load_csr(path, mmap=True):
+    mode = 'r' if mmap else None
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+
+    def load(name):
+        return np.load(os.path.join(path, name + '.npy'), mmap_mode=mode)
+
+    columns = {}
+    for kind in ('node_attrs', 'edge_attrs'):
+        columns[kind] = {name: (load(info['file']), load(info['file'] + '_mask') if info['masked'] else None)
+                         for name, info in meta[kind].items()}
+    return CSRGraph(load('nodes'), load('indptr'), load('indices'), meta['directed'],
+                    columns['node_attrs'], columns['edge_attrs'], meta['graph'], path if mmap else None)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    :return: sha1 hex digest of the content of the file at path.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_source(path):
+    """
+    Parse a source file into a list of networkX graphs plus whether it held a single graph.
+    """
+    if path.endswith('.gml'):
+        return [nx.read_gml(path)], True
+    with open(path, 'rb') as f:
+        content = pickle.load(f)
+    if isinstance(content, nx.Graph):
+        return [content], True
+    return list(content), False
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _cache_path(path, cache_dir=None):
+    """
+    Store entry of a source file. Entries are named after the content hash, but
+    a stamp of the source's size and mtime is kept next to them, so an
+    unchanged file is not hashed again.
+
+    :return: (entry path, stamp to record, or None if the recorded one still holds).
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    stamp = _stamp(path)
+    try:
+        with open(os.path.join(cache_dir, os.path.basename(path) + '.stamp.json'), 'r') as f:
+            recorded = json.load(f)
+        if all(recorded[name] == value for name, value in stamp.items()):
+            return os.path.join(cache_dir, recorded['entry']), None
+    except (OSError, ValueError, KeyError):
+        pass
+    stamp['entry'] = '%s-%s-v%d' % (os.path.basename(path), file_hash(path)[:16], FORMAT_VERSION)
+    return os.path.join(cache_dir, stamp['entry']), stamp
+
+
+def _write_stamp(path, stamp, cache_dir):
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=cache_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(stamp, f)
+    os.replace(tmp, os.path.join(cache_dir, os.path.basename(path) + '.stamp.json'))
+
+
+def convert(path, cache_dir=None):
+    """
+    Convert a .gml or pickled graph(s) file into the on-disk CSR store, unless
+    an entry for the same file content already exists. The content is only
+    hashed when the file's size or mtime differ from the last conversion.
+
+    :param: path: path of the source file.
+            cache_dir: where converted graphs are kept (default: .graph_cache next to the source).
+    :return: path of the store entry.
+    """
+    target, stamp = _cache_path(path, cache_dir)
+    if not os.path.exists(os.path.join(target, 'manifest.json')):
+        _convert(path, target)
+    if stamp is not None:
+        _write_stamp(path, stamp, os.path.dirname(target))
+    return target
+
+
+def _convert(path, target):
+    graphs, single = _read_source(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=os.path.dirname(target))
+    try:
+        for i, G in enumerate(graphs):
+            _save_csr(csr_from_networkx(G), os.path.join(tmp, str(i)))
+        with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+            json.dump({'source': os.path.abspath(path), 'count': len(graphs), 'single': single}, f)
+        os.rename(tmp, target)
+    except OSError:
+        # another process finished the same conversion first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(target, 'manifest.json')):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+class LazyGraphList:
+    """
+    Read-only sequence over the graphs of a store entry; each graph is only
+    opened (memory-mapped) when it is first accessed.
+    """
+
+    def __init__(self, entry, as_networkx=False, mmap=True):
+        self.entry = entry
+        self.as_networkx = as_networkx
+        self.mmap = mmap
+        with open(os.path.join(entry, 'manifest.json'), 'r') as f:
+            self._count = json.load(f)['count']
+        self._loaded = {}
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('graph index out of range')
+        if i not in self._loaded:
+            graph = _load_csr(os.path.join(self.entry, str(i)), self.mmap)
+            self._loaded[i] = graph.to_networkx() if self.as_networkx else graph
+        return self._loaded[i]
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+
+def load_graphs(path, as_networkx=False, cache_dir=None, mmap=True):
+    """
+    Open every graph stored in a .gml or pickle file through the CSR store.
+
+    :param: path: path of the source file.
+            as_networkx: return networkX objects instead of CSRGraph.
+            cache_dir: where converted graphs are kept (default: .graph_cache next to the source).
+            mmap: memory-map the arrays instead of reading them into memory.
+    :return: LazyGraphList of the graphs in the file.
+    """
+    return LazyGraphList(convert(path, cache_dir), as_networkx, mmap)
+
+
+def load_graph(path, as_networkx=False, cache_dir=None, mmap=True):
+    """
+    Like load_graphs, for files holding a single graph (e.g. .gml).
+
+    :return: CSRGraph, or a networkX object if as_networkx is True.
+    """
+    graphs = load_graphs(path, as_networkx, cache_dir, mmap)
+    if len(graphs) != 1:
+        raise ValueError('%s holds %d graphs, use load_graphs' % (path, len(graphs)))
+    return graphs[0]
+
+
+def csr_from_edges(n, edges, directed=False, nodes=None):
+    """
+    Build a CSRGraph from an edge array without going through networkX.
+
+    :param: n: number of nodes.
+            edges: int array of shape (m, 2) with node indices in [0, n).
+            directed: whether edges are one-way.
+            nodes: node labels (default: 0..n-1).
+    :return: CSRGraph without attributes.
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources, targets = edges[:, 0], edges[:, 1]
+    if not directed:
+        sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    if nodes is None:
+        nodes = np.arange(n)
+    return CSRGraph(np.asarray(nodes), indptr, targets[order], directed)
+
+
+def fingerprint(G, edge_attr=None, node_attr=None):
+    """
+    Cheap in-memory identity of a networkX graph: changes whenever nodes or
+    edges change, or the values of edge_attr / node_attr when given.
+    """
+    edges = G.edges(data=edge_attr) if edge_attr else G.edges()
+    key = (G.number_of_nodes(), G.number_of_edges(), hash(tuple(edges)))
+    if node_attr:
+        key += (hash(tuple(G.nodes(data=node_attr))),)
+    return key
+
+
+class GraphCache:
+    """
+    Results computed per graph, held weakly and dropped as soon as the graph's
+    fingerprint changes.
+    """
+
+    def __init__(self, edge_attr=None, node_attr=None):
+        self.edge_attr = edge_attr
+        self.node_attr = node_attr
+        self._entries = weakref.WeakKeyDictionary()
+
+    def entry(self, G):
+        """
+        :return: dict of cached results for G, emptied if G changed since they were stored.
+        """
+        key = fingerprint(G, self.edge_attr, self.node_attr)
+        cached = self._entries.get(G)
+        if cached is None or cached[0] != key:
+            cached = (key, {})
+            self._entries[G] = cached
+        return cached[1]
+
+    def clear(self, G=None):
+        if G is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(G, None)
@@ -0,0 +1,157 @@
+import networkx as nx
+import numpy as np
+from scipy.sparse import diags
+from scipy.sparse.linalg import ArpackNoConvergence, svds
+
+
+def _matrix(G, weight):
+    nodes = list(G)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, dtype=float, format='csr')
+    return A, nodes
+
+
+def pagerank(G, alpha=0.85, tol=1e-6, max_iter=100, personalization=None, start=None, weight='weight'):
+    """
+    PageRank by power iteration on the CSR transition matrix, with the same
+    update and stopping rule as nx.pagerank (L1 change below n * tol).
+
+    :param: G: networkX object.
+            alpha: damping factor, or a sequence of damping factors solved together:
+                   every iteration then does one sparse product with an (n × len(alpha)) block.
+            tol: convergence tolerance.
+            max_iter: maximal number of iterations.
+            personalization: dict node -> weight for the teleport (and dangling) distribution.
+            start: warm start, e.g. the 'vector' of a previous result (normalized to sum 1).
+    :return: dict with 'scores' (node -> value, or a list of such dicts for several alphas),
+             'vector' (array (n,) or (n, len(alpha)), usable as start), 'nodes', 'iterations',
+             'residual' (last L1 change) and 'converged' (per alpha when several).
+    """
+    A, nodes = _matrix(G, weight)
+    n = len(nodes)
+    batched = np.ndim(alpha) > 0
+    alphas = np.atleast_1d(np.asarray(alpha, dtype=float))
+    if n == 0:
+        return {'scores': [{} for _ in alphas] if batched else {}, 'vector': np.zeros((0, len(alphas))) if batched else np.zeros(0),
+                'nodes': nodes, 'iterations': 0, 'residual': 0.0, 'converged': [True] * len(alphas) if batched else True}
+    out_weight = np.asarray(A.sum(axis=1)).ravel()
+    inverse = np.zeros(n)
+    inverse[out_weight != 0] = 1.0 / out_weight[out_weight != 0]
+    # transposed, row-normalized transition matrix: one product advances every column
+    transition = (diags(inverse) @ A).T.tocsr()
+    dangling = np.flatnonzero(out_weight == 0)
+
+    if personalization is None:
+        p = np.repeat(1.0 / n, n)
+    else:
+        p = np.array([personalization.get(node, 0) for node in nodes], dtype=float)
+        if p.sum() == 0:
+            raise ZeroDivisionError('personalization vector sums to zero')
+        p /= p.sum()
+    if start is None:
+        x = np.repeat(1.0 / n, n)[:, None].repeat(len(alphas), axis=1)
+    else:
+        x = np.array(start, dtype=float).reshape(n, -1) * np.ones((1, len(alphas)))
+        x /= x.sum(axis=0)
+
+    iterations = np.zeros(len(alphas), dtype=int)
+    residual = np.full(len(alphas), np.inf)
+    active = np.ones(len(alphas), dtype=bool)
+    for _ in range(max_iter):
+        last = x[:, active]
+        step = alphas[active] * (transition @ last + last[dangling].sum(axis=0) * p[:, None]) + (1 - alphas[active]) * p[:, None]
+        x[:, active] = step
+        residual[active] = np.abs(step - last).sum(axis=0)
+        iterations[active] += 1
+        active &= ~(residual < n * tol)
+        if not active.any():
+            break
+    converged = ~active
+    if batched:
+        return {'scores': [dict(zip(nodes, x[:, j].tolist())) for j in range(len(alphas))],
+                'vector': x, 'nodes': nodes, 'iterations': iterations.tolist(),
+                'residual': residual.tolist(), 'converged': converged.tolist()}
+    return {'scores': dict(zip(nodes, x[:, 0].tolist())), 'vector': x[:, 0], 'nodes': nodes,
+            'iterations': int(iterations[0]), 'residual': float(residual[0]), 'converged': bool(converged[0])}
+
+
+def _hits_svd(A, AT, tol, max_iter, start):
+    """
+    The top right singular vector, exactly as nx.hits computes it, normalized to
+    sum 1, with its eigen-residual |A^T A a - sigma^2 a|_1 (None if ARPACK fails).
+    """
+    try:
+        _, s, vt = svds(A, k=1, v0=start, maxiter=max_iter, tol=tol)
+    except ArpackNoConvergence:
+        return None
+    a = vt.flatten().real
+    a = a / a.sum()
+    return a, float(np.abs(AT @ (A @ a) - s[0] ** 2 * a).sum())
+
+
+def hits(G, tol=1e-8, max_iter=100, start=None, weight='weight', method='power'):
+    """
+    HITS hubs and authorities, with both vectors normalized to sum 1 (as nx.hits).
+    The 'power' method iterates the authority vector on A^T A; when the top two
+    singular values are too close for it to converge within max_iter, it falls
+    back to the ARPACK singular vector nx.hits uses. The 'svd' method goes
+    straight to ARPACK, as nx.hits. When the top singular value is repeated
+    (e.g. bipartite graphs) the result is not unique: power iteration returns
+    the one reached from the uniform start, ARPACK one depending on its random
+    start vector, in nx.hits too.
+
+    :param: G: networkX object.
+            tol: convergence tolerance on the L1 change of the authority vector (scaled by n).
+            max_iter: maximal number of iterations.
+            start: warm start authority vector, e.g. the 'authority_vector' of a previous result.
+            method: 'power' or 'svd'.
+    :return: dict with 'hubs' and 'authorities' (node -> value), 'authority_vector', 'nodes',
+             'iterations', 'residual' and 'converged'. When the vector comes from ARPACK,
+             'iterations' is None (svds does not report them) and 'residual' is
+             |A^T A a - sigma^2 a|_1 for the authority vector a and top singular value sigma.
+    """
+    if method not in ('power', 'svd'):
+        raise ValueError('Unknown HITS method')
+    A, nodes = _matrix(G, weight)
+    n = len(nodes)
+    if n == 0:
+        return {'hubs': {}, 'authorities': {}, 'authority_vector': np.zeros(0), 'nodes': nodes,
+                'iterations': 0, 'residual': 0.0, 'converged': True}
+    AT = A.T.tocsr()
+    if method == 'svd':
+        result = _hits_svd(A, AT, tol, max_iter, None if start is None else np.array(start, dtype=float))
+        if result is None:
+            return {'hubs': {}, 'authorities': {}, 'authority_vector': np.zeros(n), 'nodes': nodes,
+                    'iterations': None, 'residual': np.inf, 'converged': False}
+        a, residual = result
+        h = A @ a
+        h /= h.sum()
+        return {'hubs': dict(zip(nodes, h.tolist())), 'authorities': dict(zip(nodes, a.tolist())),
+                'authority_vector': a, 'nodes': nodes, 'iterations': None, 'residual': residual, 'converged': True}
+    a = np.repeat(1.0 / n, n) if start is None else np.array(start, dtype=float)
+    a /= a.sum()
+    residual = np.inf
+    iterations = 0
+    for _ in range(max_iter):
+        last = a
+        a = AT @ (A @ a)
+        total = a.sum()
+        if total == 0:
+            break
+        a /= total
+        iterations += 1
+        residual = np.abs(a - last).sum()
+        if residual < n * tol:
+            break
+    converged = residual < n * tol
+    if not converged:
+        fallback = _hits_svd(A, AT, tol, max_iter, a if np.isfinite(a).all() and a.any() else None)
+        if fallback is not None:
+            a, residual = fallback
+            iterations = None
+            converged = True
+    h = A @ a
+    if h.sum() != 0:
+        h /= h.sum()
+    return {'hubs': dict(zip(nodes, h.tolist())), 'authorities': dict(zip(nodes, a.tolist())),
+            'authority_vector': a, 'nodes': nodes, 'iterations': iterations,
+            'residual': float(residual), 'converged': bool(converged)}
@@ -0,0 +1,364 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import dijkstra, shortest_path
+from scipy.stats import norm
+
+import graph_store
+
+# Upper bound on the number of distance-matrix cells held at once by a sweep.
+BLOCK_CELLS = 1 << 24
+# Default number of sampled sources in approximate mode, and how many are added
+# per round when sampling towards a target error.
+DEFAULT_SAMPLES = 256
+SAMPLE_ROUND = 32
+# Graphs up to this many nodes get exact betweenness in top_k_betweenness.
+EXACT_MAX_NODES = 1000
+
+
+def adjacency(G):
+    """
+    Unweighted sparse adjacency of a graph.
+
+    :param: G: networkX object or graph_store.CSRGraph.
+    :return: tuple (scipy csr_array, list of node labels in row order, whether the graph is directed).
+    """
+    if isinstance(G, graph_store.CSRGraph):
+        n = G.number_of_nodes()
+        A = csr_array((np.ones(len(G.indices), dtype=np.int8), G.indices, G.indptr), shape=(n, n))
+        return A, G.nodes.tolist(), G.directed
+    nodes = list(G.nodes())
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, dtype=np.int8, format='csr')
+    return A, nodes, G.is_directed()
+
+
+def _sweep(A, directed, sources, block_size=None):
+    """
+    One BFS per source, processed in blocks of sources.
+
+    :return: tuple (sum of distances, eccentricity of every source).
+             Eccentricity is inf for sources that don't reach every node.
+    """
+    n = A.shape[0]
+    if block_size is None:
+        block_size = max(1, BLOCK_CELLS // max(n, 1))
+    total = 0
+    ecc = np.empty(len(sources))
+    for start in range(0, len(sources), block_size):
+        block = sources[start:start + block_size]
+        dist = shortest_path(A, directed=directed, unweighted=True, indices=block)
+        finite = np.isfinite(dist)
+        total += dist[finite].sum()
+        ecc[start:start + len(block)] = dist.max(axis=1)
+    return total, ecc
+
+
+_worker_adjacency = None
+
+
+def _init_worker(A, directed):
+    global _worker_adjacency
+    _worker_adjacency = (A, directed)
+
+
+def _sweep_worker(sources):
+    A, directed = _worker_adjacency
+    return _sweep(A, directed, sources)
+
+
+def _summarize(nodes, total, ecc):
+    n = len(nodes)
+    if n == 0:
+        raise nx.NetworkXPointlessConcept('the null graph has no paths, thus there is no average shortest path length')
+    if np.isinf(ecc).any():
+        raise nx.NetworkXError('Graph is not connected (or the digraph is not strongly connected)')
+    ecc = ecc.astype(np.int64)
+    return {'spl': float(total) / (n * (n - 1)) if n > 1 else 0,
+            'diameter': int(ecc.max()),
+            'radius': int(ecc.min()),
+            'eccentricity': dict(zip(nodes, ecc.tolist()))}
+
+
+def shortest_path_stats(G, workers=1, block_size=None):
+    """
+    Average shortest path length, diameter, radius and eccentricities from a
+    single BFS per source on the sparse adjacency of the graph.
+
+    :param: G: networkX object or graph_store.CSRGraph, connected (strongly connected if directed).
+            workers: number of processes the sources are split across.
+            block_size: number of sources whose distance rows are held in memory at once.
+    :return: dict with 'spl', 'diameter', 'radius' and 'eccentricity' (node -> eccentricity).
+    """
+    A, nodes, directed = adjacency(G)
+    sources = np.arange(len(nodes))
+    if workers > 1 and len(nodes) > 1:
+        chunks = np.array_split(sources, min(workers * 4, len(nodes)))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(A, directed)) as executor:
+            results = list(executor.map(_sweep_worker, chunks))
+        total = sum(result[0] for result in results)
+        ecc = np.concatenate([result[1] for result in results])
+    else:
+        total, ecc = _sweep(A, directed, sources, block_size)
+    return _summarize(nodes, total, ecc)
+
+
+def networks_shortest_path_stats(networks, workers=1):
+    """
+    shortest_path_stats for many networks, with whole networks spread across processes.
+
+    :param: networks: iterable of networkX objects or graph_store.CSRGraph.
+            workers: number of processes.
+    :return: list of dicts as returned by shortest_path_stats, in input order.
+    """
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            return list(executor.map(shortest_path_stats, networks))
+    return [shortest_path_stats(G) for G in networks]
+
+
+def _distances(A, directed, sources):
+    dist = shortest_path(A, directed=directed, unweighted=True, indices=sources)
+    if np.isinf(dist).any():
+        raise nx.NetworkXError('Graph is not connected (or the digraph is not strongly connected)')
+    return dist.astype(np.int64)
+
+
+def _diameter_bounds(A, directed, lower, upper, budget):
+    """
+    Tighten diameter bounds with a double sweep and, for undirected graphs,
+    the iFUB fringe search around the highest degree node, using at most
+    budget BFS runs (beyond the first three).
+    """
+    degrees = np.diff(A.indptr)
+    root = int(np.argmax(degrees))
+    dist_root = _distances(A, directed, [root])[0]
+    far = int(np.argmax(dist_root))
+    lower = max(lower, int(_distances(A, directed, [far])[0].max()))
+    if directed:
+        ecc_in = int(_distances(A.T.tocsr(), directed, [root])[0].max())
+        return lower, min(upper, int(dist_root.max()) + ecc_in)
+    upper = min(upper, 2 * int(dist_root.max()))
+    level = int(dist_root.max())
+    while lower < upper and level > 0 and budget > 0:
+        fringe = np.flatnonzero(dist_root == level)
+        if len(fringe) > budget:
+            lower = max(lower, int(_distances(A, directed, fringe[:budget]).max()))
+            break
+        budget -= len(fringe)
+        lower = max(lower, int(_distances(A, directed, fringe).max()))
+        # every pair not yet checked has both ends within distance level - 1 of the root
+        upper = min(upper, max(lower, 2 * (level - 1)))
+        level -= 1
+    return lower, max(lower, upper)
+
+
+def approximate_shortest_path_stats(G, samples=None, target_error=None, confidence=0.95, diameter_bfs=DEFAULT_SAMPLES, seed=209505593):
+    """
+    Estimate the average shortest path length from BFS runs on sampled sources,
+    and bound the diameter from both sides, for graphs too large for exact all-pairs work.
+
+    :param: G: networkX object or graph_store.CSRGraph, connected (strongly connected if directed).
+            samples: maximal number of sampled sources (default DEFAULT_SAMPLES, or every node when only target_error is given).
+            target_error: sample until the half-width of the SPL confidence interval is at most this value.
+            confidence: confidence level of the SPL interval.
+            diameter_bfs: number of BFS runs spent on tightening the diameter bounds.
+            seed: seed of the source sampling.
+    :return: dict with 'spl', 'spl_ci' (lower, upper), 'samples', 'diameter' (the lower bound, which
+             is attained by an actual pair) and 'diameter_bounds' (lower, upper).
+    """
+    A, nodes, directed = adjacency(G)
+    n = len(nodes)
+    if n == 0:
+        raise nx.NetworkXPointlessConcept('the null graph has no paths, thus there is no average shortest path length')
+    if n == 1:
+        return {'spl': 0, 'spl_ci': (0, 0), 'samples': 1, 'diameter': 0, 'diameter_bounds': (0, 0)}
+    if samples is None:
+        samples = n if target_error is not None else DEFAULT_SAMPLES
+    samples = max(2, min(samples, n))
+    order = np.random.default_rng(seed).permutation(n)
+    z = norm.ppf(0.5 + confidence / 2)
+
+    source_means = []
+    lower = 0
+    upper = np.inf
+    taken = 0
+    half_width = np.inf
+    while taken < samples:
+        step = samples - taken if target_error is None else min(SAMPLE_ROUND, samples - taken)
+        for start in range(taken, taken + step, max(1, BLOCK_CELLS // n)):
+            block = order[start:min(start + max(1, BLOCK_CELLS // n), taken + step)]
+            dist = _distances(A, directed, block)
+            source_means.extend(dist.sum(axis=1) / (n - 1))
+            ecc = dist.max(axis=1)
+            lower = max(lower, int(ecc.max()))
+            if not directed:
+                upper = min(upper, 2 * int(ecc.min()))
+        taken += step
+        # finite population correction: sampling is without replacement
+        half_width = z * np.std(source_means, ddof=1) / np.sqrt(taken) * np.sqrt((n - taken) / (n - 1))
+        if target_error is not None and half_width <= target_error:
+            break
+    spl = float(np.mean(source_means))
+
+    lower, upper = _diameter_bounds(A, directed, lower, upper, diameter_bfs)
+    return {'spl': spl,
+            'spl_ci': (float(spl - half_width), float(spl + half_width)),
+            'samples': taken,
+            'diameter': lower,
+            'diameter_bounds': (lower, int(upper))}
+
+
+def _histogram_sweep(A, directed, sources, max_steps, block_size=None):
+    n = A.shape[0]
+    if block_size is None:
+        block_size = max(1, BLOCK_CELLS // max(n, 1))
+    histograms = np.zeros((len(sources), max_steps + 1), dtype=np.int64)
+    for start in range(0, len(sources), block_size):
+        block = sources[start:start + block_size]
+        # BFS that stops expanding past max_steps; farther nodes stay at inf
+        dist = dijkstra(A, directed=directed, unweighted=True, indices=block, limit=max_steps)
+        for d in range(max_steps + 1):
+            histograms[start:start + len(block), d] = np.count_nonzero(dist == d, axis=1)
+    return histograms
+
+
+def _histogram_worker(sources, max_steps):
+    A, directed = _worker_adjacency
+    return _histogram_sweep(A, directed, sources, max_steps)
+
+
+def distance_histograms(G, max_steps, workers=1):
+    """
+    Per-node histograms of shortest path lengths up to max_steps, from BFS runs
+    cut off at max_steps, so memory is O(n * max_steps) rather than O(n^2).
+
+    :param: G: networkX object or graph_store.CSRGraph.
+            max_steps: largest distance counted.
+            workers: number of processes the sources are split across.
+    :return: tuple (node list, int array of shape (n, max_steps + 1)); entry [i, d] is the
+             number of nodes at distance d from node i (following out-edges), d = 0 being the node itself.
+    """
+    A, nodes, directed = adjacency(G)
+    sources = np.arange(len(nodes))
+    if workers > 1 and len(nodes) > 1:
+        chunks = np.array_split(sources, min(workers * 4, len(nodes)))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(A, directed)) as executor:
+            histograms = np.concatenate(list(executor.map(_histogram_worker, chunks, [max_steps] * len(chunks))))
+    else:
+        histograms = _histogram_sweep(A, directed, sources, max_steps)
+    return nodes, histograms
+
+
+def _dependencies(A, AT, sources):
+    """
+    Brandes' dependency of every source on every node: the (unweighted) shortest
+    paths from the source that pass through each node. All sources advance
+    together, one sparse product per BFS level forwards (path counts) and one
+    per level backwards (dependencies).
+
+    :return: array (len(sources), n).
+    """
+    n = A.shape[0]
+    columns = np.arange(len(sources))
+    sigma = np.zeros((n, len(sources)))
+    sigma[sources, columns] = 1
+    visited = sigma > 0
+    frontier = sigma.copy()
+    levels = [visited.copy()]
+    while True:
+        reach = AT @ frontier
+        new = reach > 0
+        new &= ~visited
+        if not new.any():
+            break
+        visited |= new
+        frontier = np.where(new, reach, 0)
+        sigma += frontier
+        levels.append(new)
+    inverse = np.divide(1.0, sigma, out=np.zeros_like(sigma), where=visited)
+    delta = np.zeros((n, len(sources)))
+    for level in range(len(levels) - 1, 0, -1):
+        coefficient = np.where(levels[level], (1 + delta) * inverse, 0)
+        delta += np.where(levels[level - 1], sigma * (A @ coefficient), 0)
+    delta[sources, columns] = 0
+    return delta.T
+
+
+def top_k_betweenness(G, k=1, confidence=0.95, exact_max_nodes=EXACT_MAX_NODES, initial_samples=64, growth=1.25, seed=209505593):
+    """
+    The k nodes of highest (normalized, unweighted) betweenness centrality.
+
+    Graphs of at most exact_max_nodes nodes use nx.betweenness_centrality (ties
+    keep node order, as a stable sort would). Larger graphs sample BFS sources
+    without replacement in growing batches and stop as soon as empirical
+    Bernstein intervals separate the top k from the rest with the requested
+    confidence. As in KADABRA, the failure probability is not split evenly over
+    the nodes: a pilot batch of initial_samples sources (not used in the
+    estimates) picks the 4k likeliest candidates, which share half of it, so the
+    intervals that decide the boundary are the tightest. When every node has
+    been sampled the result is exact.
+
+    :param: G: networkX object.
+            k: number of nodes to return.
+            confidence: probability that the returned set is the true top k.
+    :return: dict with 'nodes' and 'scores' (betweenness, estimated when sampled) in decreasing order,
+             'samples' (number of BFS sources used, pilot included) and 'exact'.
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if n <= exact_max_nodes or k >= n:
+        betweenness = nx.betweenness_centrality(G)
+        ranking = sorted(betweenness, key=betweenness.get, reverse=True)[:k]
+        return {'nodes': ranking, 'scores': [betweenness[node] for node in ranking], 'samples': n, 'exact': True}
+
+    A, _, _ = adjacency(G)
+    A = A.astype(np.float64)
+    AT = A.T.tocsr()
+    block_size = max(1, BLOCK_CELLS // (4 * n))
+    order = np.random.default_rng(seed).permutation(n)
+
+    def dependencies(sources):
+        # per source, delta / (n - 2) lies in [0, 1]
+        total = np.zeros(n)
+        total_sq = np.zeros(n)
+        for start in range(0, len(sources), block_size):
+            delta = _dependencies(A, AT, sources[start:start + block_size]) / (n - 2)
+            total += delta.sum(axis=0)
+            total_sq += (delta * delta).sum(axis=0)
+        return total, total_sq
+
+    pilot = min(initial_samples, n)
+    pilot_total, _ = dependencies(order[:pilot])
+    candidates = np.argsort(-pilot_total, kind='stable')[:4 * k]
+    max_rounds = int(np.ceil(np.log(n / initial_samples) / np.log(growth))) + 2
+    failure = np.full(n, (1 - confidence) / 2 / max(n - len(candidates), 1) / max_rounds)
+    failure[candidates] = (1 - confidence) / 2 / len(candidates) / max_rounds
+    log_term = np.log(2 / failure)
+
+    total = np.zeros(n)
+    total_sq = np.zeros(n)
+    taken = pilot
+    target = pilot + initial_samples
+    while True:
+        batch_total, batch_sq = dependencies(order[taken:min(target, n)])
+        total += batch_total
+        total_sq += batch_sq
+        taken = min(target, n)
+        # normalized betweenness is n / (n - 1) times the mean of delta / (n - 2) over all sources
+        if taken >= n:
+            estimate = (total + pilot_total) / (n - 1)
+            ranking = np.argsort(-estimate, kind='stable')
+            break
+        t = taken - pilot
+        mean = total / t
+        estimate = n / (n - 1) * mean
+        ranking = np.argsort(-estimate, kind='stable')
+        variance = np.maximum(total_sq / t - mean * mean, 0) * t / (t - 1)
+        width = n / (n - 1) * (np.sqrt(2 * variance * log_term / t) + 7 * log_term / (3 * (t - 1)))
+        if (estimate[ranking[:k]] - width[ranking[:k]]).min() >= (estimate[ranking[k:]] + width[ranking[k:]]).max():
+            break
+        target = pilot + int(np.ceil((target - pilot) * growth))
+    top = ranking[:k]
+    return {'nodes': [nodes[i] for i in top], 'scores': estimate[top].tolist(), 'samples': taken, 'exact': taken >= n}
@@ -0,0 +1,49 @@
+import warnings
+
+import networkx as nx
+import numpy as np
+import powerlaw
+import pytest
+
+import EX1
+
+
+def degree_graphs():
+    for seed in range(3):
+        yield nx.gnp_random_graph(500, 0.02, seed=seed)
+        yield nx.barabasi_albert_graph(1000, 3, seed=seed)
+        yield nx.powerlaw_cluster_graph(800, 2, 0.3, seed=seed)
+
+
+@pytest.mark.parametrize('discrete', [True, False])
+@pytest.mark.parametrize('G', list(degree_graphs()))
+def test_fit_power_law_matches_powerlaw_fit(G, discrete):
+    degrees = [d for n, d in G.degree()]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        fit = powerlaw.Fit(degrees, discrete=discrete, verbose=False)
+        gamma = fit.power_law.alpha
+    fast_gamma, fast_xmin = EX1.fit_power_law(np.bincount(degrees), discrete)
+    assert fast_xmin == fit.xmin
+    assert fast_gamma == pytest.approx(gamma, abs=1e-3)
+    assert EX1._gamma_class(fast_gamma) == EX1._gamma_class(gamma)
+
+
+def test_binomial_p_values_match_binom_test():
+    from scipy.stats import binom_test
+    rng = np.random.default_rng(6)
+    n = np.concatenate([rng.integers(1, 60, 40), rng.integers(1000, 200000, 40)])
+    p = np.concatenate([rng.choice([0.01, 0.1, 0.3, 0.6], 60), rng.random(20)])
+    k = np.minimum(n, np.round(rng.normal(n * p, 3 * np.sqrt(n * p * (1 - p)) + 1)).clip(0))
+    # outcomes at the mean and at both ends
+    k[:3], k[3:6], k[6:9] = np.floor(n[:3] * p[:3]), 0, n[6:9]
+    fast = EX1.binomial_two_sided_p_values(k, n, p)
+    reference = [binom_test(int(k_i), int(n_i), p_i) for k_i, n_i, p_i in zip(k, n, p)]
+    np.testing.assert_allclose(fast, reference, rtol=1e-6, atol=1e-12)
+
+
+def test_hypothesis_matrix_matches_most_probable_p():
+    networks = [nx.gnp_random_graph(n, p, seed=n) for n in (50, 200) for p in (0.01, 0.1, 0.3, 0.6, 0.45)]
+    nodes, edges = EX1.network_counts(networks)
+    matrix = EX1.rand_nets_hypothesis_matrix(nodes, edges, [0.01, 0.1, 0.3, 0.6])
+    assert matrix['most_probable_p'].tolist() == [EX1.most_probable_p(G) for G in networks]
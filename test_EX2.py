@@ -0,0 +1,62 @@
+import gzip
+import warnings
+
+import networkx as nx
+import pytest
+
+import EX2
+import benchmarks
+
+
+def clique_graphs():
+    for seed in range(3):
+        yield nx.gnp_random_graph(60, 0.2, seed=seed)
+        yield nx.powerlaw_cluster_graph(150, 4, 0.6, seed=seed)
+    yield nx.caveman_graph(5, 6)
+    yield nx.complete_graph(7)
+
+
+@pytest.mark.parametrize('G', list(clique_graphs()))
+def test_clique_percolation_levels_match_k_clique_communities(G):
+    levels = list(EX2.clique_percolation_levels(G))
+    max_k = max(len(c) for c in nx.find_cliques(G))
+    assert [k for k, communities in levels] == list(range(max_k - 1, 2, -1))
+    for k, communities in levels:
+        reference = [set(c) for c in nx.community.k_clique_communities(G, k)]
+        assert [set(c) for c in communities] == reference, k
+
+
+@pytest.fixture(scope='module')
+def tweets_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('tweets')
+    start_date, end_date = benchmarks.tweet_dumps(str(directory), 5, 400, players=40, users=200)
+    # one day as plain text, and a line that is not valid JSON
+    gz_path = directory / 'Hebrew_tweets.json.2019-03-02.0.gz'
+    with gzip.open(gz_path, 'rt', encoding='utf-8') as file:
+        lines = file.readlines()
+    gz_path.unlink()
+    lines.insert(10, '{"retweeted_status": {"user": \n')
+    (directory / 'Hebrew_tweets.json.2019-03-02.0.txt').write_text(''.join(lines), encoding='utf-8')
+    return str(directory), start_date, end_date
+
+
+@pytest.mark.parametrize('budget', [0, 50])
+def test_construct_heb_edges_paths_agree(tweets_dir, tmp_path, budget):
+    directory, start_date, end_date = tweets_dir
+    cache_dir = str(tmp_path / 'cache')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        stats = {}
+        sequential = EX2.construct_heb_edges(directory, start_date, end_date, budget, stats=stats)
+        parallel = EX2.construct_heb_edges(directory, start_date, end_date, budget, workers=2)
+        cold = EX2.construct_heb_edges(directory, start_date, end_date, budget, cache_dir=cache_dir)
+        warm = EX2.construct_heb_edges(directory, start_date, end_date, budget, cache_dir=cache_dir)
+        indexed = EX2.RetweetIndex(directory, cache_dir=cache_dir).edges(start_date, end_date, budget)
+    assert stats['files'] == 5 and stats['malformed'] == 1
+    assert sequential
+    # same edges with the same counts, in the same order
+    expected = list(sequential.items())
+    assert list(parallel.items()) == expected
+    assert list(cold.items()) == expected
+    assert list(warm.items()) == expected
+    assert list(indexed.items()) == expected
@@ -0,0 +1,69 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+from scipy.stats import ttest_ind
+
+import EX4
+
+REPLICATES = 300
+# smallest Welch p-value accepted for a metric of the two engines
+MIN_P_VALUE = 1e-3
+
+
+def epidemic_fixture(directed=False):
+    rng = random.Random(7)
+    G = nx.gnp_random_graph(200, 0.02, seed=7, directed=directed)
+    for node in G:
+        G.nodes[node]['status'] = rng.choice('SSSSSSSSIR')
+        G.nodes[node]['mortalitylikelihood'] = rng.random() * 0.1
+    for u, v in G.edges:
+        G.edges[u, v]['contacts'] = rng.randint(1, 4)
+    return G
+
+
+@pytest.mark.parametrize('directed', [False, True])
+@pytest.mark.parametrize('setting', [{'model_type': 'SIS', 'infection_time': 2, 'p': 0.05, 'epochs': 20},
+                                     {'model_type': 'SIS', 'infection_time': 5, 'p': 0.1, 'epochs': 20},
+                                     {'model_type': 'SIR', 'infection_time': 2, 'p': 0.05, 'epochs': 20},
+                                     {'model_type': 'SIR', 'infection_time': 5, 'p': 0.1, 'epochs': 20}])
+def test_replicates_engine_matches_epidemic_analysis(setting, directed):
+    G = epidemic_fixture(directed)
+    sequential = [EX4.epidemic_analysis(G, **setting, seed=seed) for seed in range(REPLICATES)]
+    vectorized = EX4.epidemic_analysis_replicates(G, **setting, replicates=REPLICATES, seed=0)
+    for metric in EX4.EPIDEMIC_METRICS:
+        reference = np.array([result[metric] for result in sequential], dtype=np.float64)
+        values = np.asarray(vectorized[metric], dtype=np.float64)
+        assert values.shape == (REPLICATES,)
+        if reference.std() == 0 and values.std() == 0:
+            assert reference.mean() == values.mean(), metric
+        else:
+            assert ttest_ind(reference, values, equal_var=False).pvalue > MIN_P_VALUE, metric
+
+
+def test_replicates_engine_respects_overlay():
+    G = epidemic_fixture()
+    infected = [node for node in G if G.nodes[node]['status'] == 'I']
+    overlay = dict.fromkeys(infected, 'R')
+    result = EX4.epidemic_analysis_replicates(G, overlay=overlay, replicates=5)
+    assert (result['infections_total'] == 0).all()
+    assert [G.nodes[node]['status'] for node in infected] == ['I'] * len(infected)
+
+
+@pytest.mark.parametrize('directed', [False, True])
+@pytest.mark.parametrize('model_type', ['SIS', 'SIR'])
+def test_event_engine_matches_epidemic_analysis(model_type, directed):
+    G = epidemic_fixture(directed)
+    overlay = dict.fromkeys(list(G)[:10], 'R')
+    index = EX4.status_index(G, overlay)
+    for seed in range(20):
+        loop = EX4.epidemic_analysis(G, model_type=model_type, p=0.1, seed=seed, overlay=overlay)
+        event = EX4.epidemic_analysis(G, model_type=model_type, p=0.1, seed=seed, overlay=overlay, engine='event',
+                                      index=index)
+        assert loop == pytest.approx(event)
+    series = list(EX4.epidemic_time_series(G, model_type=model_type, epochs=5, overlay=overlay))
+    assert [state['epoch'] for state in series] == list(range(6))
+    assert all(state['S'] + state['I'] + state['R'] == len(G) for state in series)
+    assert series[-1]['r_0'] == pytest.approx(EX4.epidemic_analysis(G, model_type=model_type, epochs=5,
+                                                                    overlay=overlay)['r_0'])